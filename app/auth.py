@@ -3,27 +3,68 @@
 实现用户注册、登录等认证相关的API接口
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import DatabaseManager
+from app.dependencies import get_db, get_db_manager
 from app.config import settings
-from app.schemas import UserCreate, UserLogin, UserResponse, Token, APIResponse
-from app.crud import user_crud
-from app.security import security_manager
+from app.schemas import UserCreate, UserLogin, UserResponse, Token, TokenData, RefreshTokenRequest, APIResponse
+from app.crud import user_crud, refresh_token_crud, DuplicateUserError
+from app.security import security_manager, revocation_list
+from app.hashing import HashQueueFullError
+from app.user_cache import user_cache
+from app.login_throttle import login_throttle
 
 # 创建路由器
 router = APIRouter(prefix="/auth", tags=["认证"])
 
-# 创建数据库管理器实例
-db_manager = DatabaseManager(settings.database_url)
+# OAuth2 Bearer令牌提取（Authorization: Bearer <token>）
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_prefix}/auth/login")
+
+async def get_current_token_data(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    获取当前请求的令牌数据依赖
+    只做令牌验证，不访问数据库
+    
+    Args:
+        token: 请求头中的Bearer令牌
+        
+    Returns:
+        TokenData: 解析出的令牌数据
+        
+    Raises:
+        HTTPException: 令牌无效时抛出401异常
+    """
+    return security_manager.verify_token(token)
 
 
-async def get_db():
+def _inactive_user_exception() -> HTTPException:
     """
-    获取数据库会话依赖
+    用户已禁用或不存在时返回的异常
+    
+    Returns:
+        HTTPException: 400异常，与登录接口对禁用账户的处理保持一致
     """
-    async for session in db_manager.get_session():
-        yield session
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="用户账户已被禁用"
+    )
+
+
+def _server_busy_exception() -> HTTPException:
+    """
+    密码哈希工作池排队已满时返回的异常
+    
+    Returns:
+        HTTPException: 503服务繁忙异常
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
 
 
 @router.post("/register", response_model=APIResponse, summary="用户注册")
@@ -45,23 +86,7 @@ async def register_user(
         HTTPException: 用户名或邮箱已存在时抛出异常
     """
     try:
-        # 检查用户名是否已存在
-        existing_user = await user_crud.get_user_by_username(db, user_data.username)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="用户名已存在"
-            )
-        
-        # 检查邮箱是否已存在
-        existing_email = await user_crud.get_user_by_email(db, user_data.email)
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="邮箱已被注册"
-            )
-        
-        # 创建用户
+        # 创建用户，用户名或邮箱是否重复由数据库唯一约束判断
         new_user = await user_crud.create_user(db, user_data)
         if not new_user:
             raise HTTPException(
@@ -70,7 +95,7 @@ async def register_user(
             )
         
         # 创建用户响应数据
-        user_response = UserResponse.from_orm(new_user)
+        user_response = UserResponse.from_record(new_user)
         
         return APIResponse.success_response(
             message="用户注册成功",
@@ -82,6 +107,13 @@ async def register_user(
         
     except HTTPException:
         raise
+    except DuplicateUserError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户名已存在" if e.field == "username" else "邮箱已被注册"
+        )
+    except HashQueueFullError:
+        raise _server_busy_exception()
     except Exception as e:
         print(f"注册过程中发生错误: {e}")
         raise HTTPException(
@@ -93,6 +125,7 @@ async def register_user(
 @router.post("/login", response_model=dict, summary="用户登录")
 async def login_user(
     login_data: UserLogin,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -100,18 +133,33 @@ async def login_user(
     
     Args:
         login_data: 用户登录数据（用户名、密码）
+        request: 当前请求（用于获取客户端IP）
         db: 数据库会话
         
     Returns:
         dict: 登录结果，包含访问令牌和用户信息
         
     Raises:
-        HTTPException: 用户名或密码错误时抛出异常
+        HTTPException: 用户名或密码错误、登录过于频繁或账户被临时锁定时抛出异常
     """
+    # 限流和锁定检查在校验密码之前，被拒绝的请求不消耗哈希算力
+    if login_throttle is not None:
+        client_ip = request.client.host if request.client else None
+        blocked = login_throttle.check(client_ip, login_data.username)
+        if blocked is not None:
+            detail, retry_after = blocked
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=detail,
+                headers={"Retry-After": str(retry_after)},
+            )
+    
     try:
         # 验证用户登录
         user = await user_crud.authenticate_user(db, login_data.username, login_data.password)
         if not user:
+            if login_throttle is not None:
+                login_throttle.record_failure(login_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名或密码错误",
@@ -125,17 +173,24 @@ async def login_user(
                 detail="用户账户已被禁用"
             )
         
-        # 创建访问令牌
-        access_token = security_manager.create_token_for_user(user.username)
+        if login_throttle is not None:
+            login_throttle.record_success(login_data.username)
         
         # 创建用户响应数据
-        user_response = UserResponse.from_orm(user)
+        user_response = UserResponse.from_record(user)
+        
+        # 创建访问令牌，用户资料一并写入令牌
+        access_token = security_manager.create_token_for_user(user.username, user_response)
+        
+        # 签发刷新令牌（不写数据库），访问令牌过期后凭它续期，无需再次校验密码
+        refresh_token = refresh_token_crud.create_refresh_token(user.id)
         
         return {
             "success": True,
             "message": "登录成功",
             "data": {
                 "access_token": access_token,
+                "refresh_token": refresh_token,
                 "token_type": "bearer",
                 "user": user_response.dict()
             }
@@ -143,6 +198,8 @@ async def login_user(
         
     except HTTPException:
         raise
+    except HashQueueFullError:
+        raise _server_busy_exception()
     except Exception as e:
         print(f"登录过程中发生错误: {e}")
         raise HTTPException(
@@ -151,22 +208,143 @@ async def login_user(
         )
 
 
+@router.post("/refresh", response_model=dict, summary="刷新访问令牌")
+async def refresh_access_token(
+    refresh_data: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    刷新访问令牌接口
+    用刷新令牌换取新的访问令牌和新的刷新令牌（旧刷新令牌随即作废），
+    只需一次按主键的数据库查询，不做密码校验
+    
+    Args:
+        refresh_data: 刷新令牌请求数据
+        db: 数据库会话
+        
+    Returns:
+        dict: 新的访问令牌、刷新令牌和用户信息
+        
+    Raises:
+        HTTPException: 刷新令牌无效、过期或用户被禁用时抛出异常
+    """
+    try:
+        rotated = await refresh_token_crud.rotate_refresh_token(db, refresh_data.refresh_token)
+        if not rotated:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="刷新令牌无效或已过期",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user, refresh_token = rotated
+        if not user.is_active:
+            raise _inactive_user_exception()
+        
+        user_response = UserResponse.from_record(user)
+        access_token = security_manager.create_token_for_user(user.username, user_response)
+        
+        return {
+            "success": True,
+            "message": "令牌刷新成功",
+            "data": {
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+                "token_type": "bearer",
+                "user": user_response.dict()
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"刷新令牌过程中发生错误: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="刷新令牌过程中发生错误"
+        )
+
+
+@router.post("/logout", response_model=APIResponse, summary="退出登录")
+async def logout_user(
+    refresh_data: Optional[RefreshTokenRequest] = None,
+    token_data: TokenData = Depends(get_current_token_data),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    退出登录接口
+    吊销当前访问令牌；请求体中带有刷新令牌时一并作废
+    
+    Args:
+        refresh_data: 刷新令牌请求数据（可选）
+        token_data: 从访问令牌中解析出的数据
+        db: 数据库会话
+        
+    Returns:
+        APIResponse: 退出结果
+    """
+    try:
+        if token_data.jti:
+            await revocation_list.revoke(db, token_data.jti, token_data.expires_at)
+        
+        if refresh_data is not None:
+            await refresh_token_crud.revoke_refresh_token(db, refresh_data.refresh_token)
+        
+        return APIResponse.success_response(message="退出登录成功")
+        
+    except Exception as e:
+        print(f"退出登录过程中发生错误: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="退出登录过程中发生错误"
+        )
+
+
 @router.get("/me", response_model=UserResponse, summary="获取当前用户信息")
 async def get_current_user_info(
-    db: AsyncSession = Depends(get_db),
-    # 这里我们先简化，后面会添加认证依赖
+    token_data: TokenData = Depends(get_current_token_data),
+    db_manager: DatabaseManager = Depends(get_db_manager)
 ):
     """
     获取当前登录用户信息接口
     
+    依次尝试：用户查询缓存 -> 令牌中的资料声明（ME_PROFILE_FROM_CLAIMS开启时） -> 数据库，
+    只有前面都没有命中时才会查询数据库（查询结果，包括用户不存在，都会写入用户查询缓存）
+    
     Args:
-        db: 数据库会话
+        token_data: 从访问令牌中解析出的数据
+        db_manager: 数据库管理器（缓存未命中时才打开会话）
         
     Returns:
         UserResponse: 当前用户信息
+        
+    Raises:
+        HTTPException: 用户不存在或已被禁用时抛出异常
     """
-    # 这是一个示例接口，实际使用时需要添加JWT认证
-    # 目前先返回一个示例响应
-    return {
-        "message": "此接口需要在完成JWT认证后实现"
-    }
\ No newline at end of file
+    username = token_data.username
+    
+    # 1. 查用户查询缓存（已禁用和不存在的用户也会被缓存，同样不用查数据库）
+    found, record = await user_cache.lookup("username", username)
+    if found:
+        if record is None or not record.is_active:
+            raise _inactive_user_exception()
+        return UserResponse.from_record(record)
+    
+    # 2. 令牌中带有完整的资料声明时直接返回
+    if settings.me_profile_from_claims:
+        profile = token_data.to_user_response()
+        if profile is not None:
+            return profile
+    
+    # 3. 缓存未命中，查询数据库
+    async for db in db_manager.get_session():
+        user = await user_crud.get_user_record_by_username(db, username)
+    
+    if user is None:
+        # 不存在的用户也写入缓存，TTL内重复请求不再查数据库（已禁用的用户由查询本身写入缓存）
+        await user_cache.put_missing("username", username)
+        raise _inactive_user_exception()
+    if not user.is_active:
+        raise _inactive_user_exception()
+    
+    return UserResponse.from_record(user)
@@ -0,0 +1,434 @@
+"""
+缓存
+带过期时间和容量上限的进程内缓存，以及可替换的异步缓存后端
+（进程内内存，或任何兼容Redis协议的服务），用于缓存用户资料等热点数据
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import unquote, urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    TTL + LRU缓存
+    每个缓存项在写入ttl秒后过期；超出容量时淘汰最久未被访问的缓存项
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        """
+        初始化缓存
+
+        Args:
+            ttl_seconds: 默认过期时间（秒）
+            max_entries: 最大缓存条目数，0表示禁用缓存
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 缓存值)，缓存值本身可以是None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Any, value: Any, ttl_seconds: Optional[float] = None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl_seconds: 过期时间（秒），不填时使用默认值
+        """
+        if not self.max_entries:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                # 最前面的就是最久未被访问的
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def replace(self, key: Any, value: Any) -> bool:
+        """
+        替换未过期的缓存值，保留原来的过期时间；缓存项不存在时不写入
+
+        Args:
+            key: 缓存键
+            value: 新的缓存值
+
+        Returns:
+            bool: 是否替换成功
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return False
+            self._entries[key] = (value, entry[1])
+            return True
+
+    def delete(self, key: Any):
+        """
+        删除缓存
+
+        Args:
+            key: 缓存键
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, float]: 命中/未命中/淘汰次数、命中率和当前大小
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBackend(ABC):
+    """
+    异步缓存后端基类
+    serializes 为True的后端把缓存值JSON序列化后保存，缓存值必须能被JSON序列化；
+    为False时直接保存对象本身，调用方可以据此选择缓存值的形式
+    """
+
+    name = ""
+    # 是否为多个工作进程共享的缓存（共享缓存删除一次即对所有进程生效）
+    shared = False
+    # 是否把缓存值序列化后保存
+    serializes = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 缓存值)
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl_seconds: 过期时间（秒），不填时使用默认值
+        """
+
+    @abstractmethod
+    async def replace(self, key: str, value: Any):
+        """
+        替换已存在的缓存值，保留原来的过期时间；缓存项不存在（或已过期）时不写入
+
+        Args:
+            key: 缓存键
+            value: 新的缓存值
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """
+        删除缓存
+
+        Args:
+            keys: 缓存键
+        """
+
+    async def close(self):
+        """
+        释放后端占用的资源
+        """
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        """
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内内存缓存后端（默认）
+    每个工作进程各有一份，读取没有任何I/O
+    """
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        """
+        初始化内存缓存后端
+
+        Args:
+            ttl_seconds: 默认过期时间（秒）
+            max_entries: 最大缓存条目数，0表示禁用缓存
+        """
+        self._cache = TTLCache(ttl_seconds, max_entries)
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self._cache.set(key, value, ttl_seconds)
+
+    async def replace(self, key: str, value: Any):
+        self._cache.replace(key, value)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._cache.delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self._cache.get_stats()}
+
+
+class RedisError(Exception):
+    """
+    Redis服务返回的错误
+    """
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis协议缓存后端
+    内置一个只实现GET/SET/DEL的最小RESP客户端，不依赖第三方库，
+    可以连接Redis、KeyDB、Dragonfly等任何兼容Redis协议的服务，多个工作进程共享同一份缓存。
+    缓存服务不可用时读取按未命中处理、写入直接忽略，不影响请求本身
+    """
+
+    name = "redis"
+    shared = True
+    serializes = True
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl_seconds: float = 60.0,
+                 key_prefix: str = "", timeout: float = 1.0, retry_interval: float = 5.0):
+        """
+        初始化Redis缓存后端
+
+        Args:
+            url: 连接URL，格式为 redis://[:password@]host[:port][/db]
+            ttl_seconds: 默认过期时间（秒）
+            key_prefix: 键前缀，用于和同一实例上的其他数据区分
+            timeout: 连接和单条命令的超时时间（秒）
+            retry_interval: 连接失败后多长时间内（秒）不再尝试，避免每个请求都等待超时
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # 一条连接上的命令必须按顺序收发，锁在第一次使用时创建，绑定到实际运行的事件循环
+        self._lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _connect(self):
+        """
+        建立连接，并按需认证和选择数据库
+        """
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", str(self.db))
+
+    def _disconnect(self):
+        """
+        关闭连接，下一条命令会重新连接
+        """
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def _send(self, *args: str) -> Any:
+        """
+        发送一条命令并读取回复（调用方需持有锁）
+        """
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self) -> Any:
+        """
+        按RESP协议读取一条回复
+        """
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis连接已关闭")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            raise RedisError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise RedisError(f"无法解析的回复: {line!r}")
+
+    async def _command(self, *args: str) -> Any:
+        """
+        执行一条命令，连接断开时自动重连
+
+        Args:
+            args: 命令及参数
+
+        Returns:
+            Any: 命令回复
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    if time.monotonic() < self._retry_at:
+                        raise ConnectionError("Redis暂不可用，等待重试")
+                    try:
+                        await asyncio.wait_for(self._connect(), self.timeout)
+                    except BaseException:
+                        self._retry_at = time.monotonic() + self.retry_interval
+                        raise
+                return await asyncio.wait_for(self._send(*args), self.timeout)
+            except BaseException:
+                # 超时、出错或被取消后连接上可能残留未读的回复，直接丢弃连接
+                self._disconnect()
+                raise
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        try:
+            data = await self._command("GET", self.key_prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"读取Redis缓存失败: {e}")
+            return False, None
+        if data is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(data)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            await self._command(
+                "SET", self.key_prefix + key, json.dumps(value, separators=(",", ":")),
+                "PX", str(max(1, int(ttl * 1000))),
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"写入Redis缓存失败: {e}")
+
+    async def replace(self, key: str, value: Any):
+        try:
+            # XX：只在键存在时写入；KEEPTTL：保留原来的过期时间（需要Redis 6.0及以上）
+            await self._command(
+                "SET", self.key_prefix + key, json.dumps(value, separators=(",", ":")), "XX", "KEEPTTL",
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"写入Redis缓存失败: {e}")
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        try:
+            await self._command("DEL", *(self.key_prefix + key for key in keys))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"删除Redis缓存失败: {e}")
+
+    async def close(self):
+        self._disconnect()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 缓存后端名称 -> 实现类
+CACHE_BACKENDS = {
+    MemoryCacheBackend.name: MemoryCacheBackend,
+    RedisCacheBackend.name: RedisCacheBackend,
+}
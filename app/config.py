@@ -3,6 +3,8 @@
 管理应用的所有配置参数，包括数据库连接、JWT设置等
 """
 
+from typing import List, Set
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,6 +14,9 @@ class Settings(BaseSettings):
     使用Pydantic的BaseSettings来管理配置，支持从环境变量读取配置
     """
     
+    # 数据库后端："mysql"，或 "sqlite"（嵌入式数据库，适合单机小规模部署和测试）
+    db_backend: str = "mysql"
+    
     # 数据库配置
     db_host: str = "localhost"
     db_port: int = 3306
@@ -19,10 +24,115 @@ class Settings(BaseSettings):
     db_password: str = ""
     db_name: str = "user_service"
     
+    # 数据库连接池配置（每个工作进程最多占用 pool_size + max_overflow 个连接）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 3600
+    # 是否在控制台输出全部SQL语句（仅用于本地调试）
+    db_echo: bool = False
+    # 只读从库（读写分离）：逗号分隔的 host 或 host:port，账号、密码和库名与主库相同；不填时只用主库
+    db_replica_hosts: str = ""
+    # 从库选择策略："round_robin"（轮询）或"least_busy"（当前借出连接最少）
+    db_replica_strategy: str = "round_robin"
+    # 写入后多长时间内（秒）该用户的读取仍走主库，应不小于从库复制延迟
+    db_read_your_writes_seconds: float = 5.0
+    # SQLite配置（DB_BACKEND=sqlite时生效）：数据库文件路径
+    sqlite_path: str = "user_service.db"
+    # 只读连接数：WAL模式下读和写互不阻塞，写连接固定为1个
+    sqlite_reader_pool_size: int = 4
+    # 内存映射读取的大小（字节）和每个连接的页缓存大小（KB）
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kb: int = 65536
+    # 数据库被其他进程锁定时的最长等待时间（毫秒）
+    sqlite_busy_timeout_ms: int = 5000
+    # SQL耗时统计：只记录超过阈值的慢查询日志，可按比例采样
+    query_stats_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    slow_query_sample_rate: float = 1.0
+    
     # JWT配置
     secret_key: str = "your-secret-key-change-in-production"
+    # 签名算法：HS256（共享密钥）、ES256、EdDSA（后两者需要配置私钥文件）
     algorithm: str = "HS256"
+    # 签名后端：jose、native、pyjwt
+    jwt_backend: str = "jose"
+    # PEM格式的私钥/公钥文件路径，公钥不填时从私钥推导
+    jwt_private_key_file: str = ""
+    jwt_public_key_file: str = ""
+    # 密钥目录（用于密钥轮换）：<kid>.pem为私钥，<kid>.pub.pem为仅用于验证的退役公钥
+    jwt_keys_dir: str = ""
+    # 当前签名使用的密钥ID，不填时取密钥目录中文件名排序最后的私钥
+    jwt_active_kid: str = ""
+    # JWKS接口的缓存时间（秒）
+    jwks_max_age_seconds: int = 3600
     access_token_expire_minutes: int = 30
+    # 刷新令牌有效期（天），每次续期都会轮换出新的刷新令牌
+    refresh_token_expire_days: int = 30
+    # 刷新令牌摘要的HMAC密钥，不填时使用secret_key
+    refresh_token_secret: str = ""
+    # 清理过期刷新令牌使用记录的间隔（秒）
+    refresh_token_prune_interval_seconds: float = 3600.0
+    # 令牌吊销列表配置
+    revocation_bloom_capacity: int = 100000
+    revocation_bloom_error_rate: float = 0.001
+    # 从数据库增量同步吊销记录的间隔（秒）
+    revocation_sync_interval_seconds: float = 5.0
+    # 清理过期吊销记录的间隔（秒）
+    revocation_prune_interval_seconds: float = 300.0
+    # 已验证令牌缓存的最大条目数，0表示禁用缓存
+    token_cache_max_entries: int = 10000
+    
+    # 密码哈希工作池配置
+    # 执行器类型："thread"（线程池）或"process"（进程池）
+    password_hash_executor: str = "thread"
+    # 工作线程/进程数，0表示使用CPU核心数
+    password_hash_workers: int = 0
+    # 最多允许多少个哈希任务同时排队，超过后直接拒绝，0表示不限制
+    password_hash_max_queue: int = 64
+    
+    # 密码哈希参数
+    # 哈希方案："bcrypt"或"argon2"（argon2需要安装argon2-cffi）
+    password_hash_scheme: str = "bcrypt"
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+    # calibrate_password_hash.py 校准时的目标校验耗时（毫秒）；
+    # 参数只离线校准后写入配置，所有工作进程使用相同参数，不会互相把对方的哈希判定为需要重新加密
+    password_hash_target_ms: float = 250.0
+    
+    # 用户查询缓存配置
+    # 缓存后端："memory"（进程内）或"redis"（任何兼容Redis协议的服务，多个工作进程共享）
+    user_cache_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 10000
+    # 缓存未命中时 /auth/me 直接使用令牌中的资料声明，不查数据库；
+    # 开启后被禁用或删除的用户在访问令牌过期前仍能取到资料，默认关闭（缓存+数据库，禁用用户在缓存TTL内生效）
+    me_profile_from_claims: bool = False
+    
+    # 跨工作进程缓存失效广播（同一台机器上的工作进程通过Unix数据报套接字互相通知）
+    invalidation_bus_enabled: bool = True
+    # 存放套接字文件的目录，同一服务的所有工作进程必须相同；不填时使用系统临时目录下的 user_service_invalidation
+    invalidation_bus_dir: str = ""
+    
+    # 登录限流与失败锁定（计数保存在共享内存文件中，同一台机器上的工作进程共享）
+    login_throttle_enabled: bool = True
+    # 每个IP在窗口内允许的登录尝试次数，0表示不限制
+    login_ip_max_attempts: int = 30
+    login_ip_window_seconds: float = 60.0
+    # 每个用户名在窗口内允许的失败次数，达到后锁定登录直到失败记录移出窗口，0表示不锁定
+    login_lockout_max_failures: int = 5
+    login_lockout_window_seconds: float = 900.0
+    # 计数器文件目录，不填时使用系统临时目录下的 user_service_counters
+    shared_counters_dir: str = ""
+    # 每张计数器表的槽位数（能同时跟踪的IP/用户名数量）
+    shared_counters_slots: int = 65536
+    
+    # 最后登录时间写缓冲：按间隔（秒）或攒够条目数时批量写回数据库
+    last_login_flush_interval_seconds: float = 5.0
+    last_login_flush_max_entries: int = 500
     
     # 应用配置
     app_name: str = "用户服务API"
@@ -31,6 +141,8 @@ class Settings(BaseSettings):
     
     # API配置
     api_v1_prefix: str = "/api/v1"
+    # 管理员用户名（逗号分隔），只有管理员可以调用用户管理接口
+    admin_usernames: str = ""
     
     class Config:
         # 指定环境变量文件位置
@@ -42,12 +154,42 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         """
         构建数据库连接URL
-        使用aiomysql驱动进行异步数据库连接
+        MySQL使用aiomysql驱动，SQLite使用aiosqlite驱动进行异步数据库连接
         
         Returns:
             str: 完整的数据库连接URL
         """
+        if self.db_backend == "sqlite":
+            return f"sqlite+aiosqlite:///{self.sqlite_path}"
         return f"mysql+aiomysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+    
+    @property
+    def admin_username_set(self) -> Set[str]:
+        """
+        管理员用户名集合
+        
+        Returns:
+            Set[str]: 管理员用户名
+        """
+        return {name.strip() for name in self.admin_usernames.split(",") if name.strip()}
+    
+    @property
+    def replica_urls(self) -> List[str]:
+        """
+        构建从库连接URL列表
+        
+        Returns:
+            List[str]: 每个从库的连接URL，未配置从库时为空列表（SQLite没有从库）
+        """
+        urls = []
+        if self.db_backend == "sqlite":
+            return urls
+        for host in filter(None, (item.strip() for item in self.db_replica_hosts.split(","))):
+            host, _, port = host.partition(":")
+            urls.append(
+                f"mysql+aiomysql://{self.db_user}:{self.db_password}@{host}:{port or self.db_port}/{self.db_name}"
+            )
+        return urls
 
 
 # 创建全局设置实例
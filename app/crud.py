@@ -4,14 +4,233 @@
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, insert, update, func, and_, or_, bindparam
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
-from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+import re
 
-from app.database import User
-from app.schemas import UserCreate, UserInDB
+from app.database import User, RefreshToken
+from app.schemas import UserCreate, UserInDB, normalize_email, normalize_username, reverse_email_domain
 from app.security import security_manager
+from app.config import settings
+from app.hashing import HashQueueFullError
+from app.last_login import last_login_buffer
+from app.replicas import REPLICA_OPTION
+from app.records import USER_RECORD_COLUMNS, UserRecord
+from app.user_cache import user_cache
+from app.invalidation import invalidation_bus
+
+
+# 唯一约束名称（或SQLite报错中的列名）与重复字段的对应关系
+DUPLICATE_CONSTRAINTS = {
+    "ix_users_username": "username",
+    "users.username": "username",
+    "ix_users_email": "email",
+    "users.email": "email",
+    "ix_users_username_normalized": "username",
+    "users.username_normalized": "username",
+    "ix_users_email_normalized": "email",
+    "users.email_normalized": "email",
+}
+
+# 从唯一约束违反的报错中提取约束名称
+# MySQL: Duplicate entry 'x' for key 'users.ix_users_username'
+# SQLite: UNIQUE constraint failed: users.username
+_DUPLICATE_KEY_PATTERN = re.compile(r"for key '([^']+)'|UNIQUE constraint failed: (\S+)")
+
+
+# 用户搜索支持的字段：字段名 -> (索引列, 把搜索词转换为该列前缀的函数)
+# domain 按域名精确查找（alice@ 之后的部分），前缀 "com.example@" 不会匹配 com.example2
+SEARCH_FIELDS = {
+    "username": (User.username_normalized, normalize_username),
+    "email": (User.email_normalized, normalize_email),
+    "domain": (User.email_domain_reversed, lambda q: reverse_email_domain("@" + q.strip().lstrip("@"))),
+}
+
+
+# 按唯一键查询用户记录的语句：字段名 -> (主库语句, 可读从库语句)
+# 只投影 UserRecord 需要的列；语句在导入时构建一次，每次执行只绑定参数，
+# 省去逐次构建语句和生成缓存键的开销，编译结果由SQLAlchemy的语句缓存复用
+_RECORD_QUERIES = {
+    field: (query, query.execution_options(**{REPLICA_OPTION: True}))
+    for field, query in (
+        ("username", select(*USER_RECORD_COLUMNS).where(User.username_normalized == bindparam("value"))),
+        ("email", select(*USER_RECORD_COLUMNS).where(User.email_normalized == bindparam("value"))),
+        ("id", select(*USER_RECORD_COLUMNS).where(User.id == bindparam("value"))),
+    )
+}
+
+
+# 按ID读取密码哈希（序列化缓存后端中的用户记录不含密码哈希，登录时从主库补读）
+_PASSWORD_HASH_QUERY = select(User.hashed_password).where(User.id == bindparam("value"))
+
+
+# 每个登录时间广播事件最多包含的用户数，使单个数据报远小于事件总线的大小上限
+LAST_LOGIN_EVENT_BATCH = 1000
+
+
+class DuplicateUserError(Exception):
+    """
+    用户名或邮箱已存在
+    由唯一约束违反（IntegrityError）转换而来，field为重复的字段名
+    """
+    
+    def __init__(self, field: str):
+        super().__init__(f"{field} 已存在")
+        self.field = field
+
+
+def duplicate_field(error: IntegrityError) -> Optional[str]:
+    """
+    根据唯一约束名称判断是哪个字段重复
+    
+    Args:
+        error: 数据库完整性错误
+        
+    Returns:
+        Optional[str]: 重复的字段名，无法识别时返回None
+    """
+    match = _DUPLICATE_KEY_PATTERN.search(str(error.orig))
+    if not match:
+        return None
+    key = match.group(1) or match.group(2)
+    # MySQL 8 的约束名带表名前缀（users.ix_users_username），两种写法都能匹配
+    return DUPLICATE_CONSTRAINTS.get(key) or DUPLICATE_CONSTRAINTS.get(key.split(".")[-1])
+
+
+async def _read_user(db: AsyncSession, query, field: str, value) -> Optional[User]:
+    """
+    按唯一键查询用户：先查用户缓存，未命中时优先读从库
+    键处在读己之写窗口内时直接读主库；从库未命中时再回查一次主库，
+    避免刚在其他工作进程注册的用户因复制延迟被判定为不存在
+    
+    Args:
+        db: 数据库会话
+        query: 查询语句
+        field: 查询字段（username、email或id）
+        value: 字段值
+        
+    Returns:
+        Optional[User]: 用户对象，如果不存在则返回None
+    """
+    user = await user_cache.get(db, field, value)
+    if user is not None:
+        return user
+    
+    router = db.info.get("router")
+    if router is None or not router.replicas or router.recently_written((field, value)):
+        user = (await db.execute(query)).scalar_one_or_none()
+    else:
+        user = (await db.execute(query.execution_options(**{REPLICA_OPTION: True}))).scalar_one_or_none()
+        if user is None:
+            user = (await db.execute(query)).scalar_one_or_none()
+    
+    if user is not None:
+        await user_cache.put(user)
+    return user
+
+
+async def _read_record(db: AsyncSession, field: str, value) -> Optional[UserRecord]:
+    """
+    按唯一键查询用户记录，缓存和主从路由规则与 _read_user 相同，
+    但只查询需要的列并直接映射为 UserRecord，不创建ORM实体
+    
+    Args:
+        db: 数据库会话
+        field: 查询字段（username、email或id），用户名和邮箱需已规范化
+        value: 字段值
+        
+    Returns:
+        Optional[UserRecord]: 用户记录，如果不存在则返回None
+    """
+    record = await user_cache.get_user_record(field, value)
+    if record is not None:
+        return record
+    
+    query, replica_query = _RECORD_QUERIES[field]
+    params = {"value": value}
+    router = db.info.get("router")
+    row = None
+    if router is not None and router.replicas and not router.recently_written((field, value)):
+        row = (await db.execute(replica_query, params)).first()
+    if row is None:
+        row = (await db.execute(query, params)).first()
+    if row is None:
+        return None
+    
+    record = UserRecord._make(row)
+    await user_cache.put(record)
+    return record
+
+
+async def invalidate_user(router, user_id: int, username: Optional[str] = None,
+                          email: Optional[str] = None, from_peer: bool = False):
+    """
+    删除本进程中该用户的缓存，并在读己之写窗口内把对该用户的查询路由到主库
+    也用于处理其他工作进程广播的失效事件
+    
+    Args:
+        router: 数据库读写分离路由器（可为None）
+        user_id: 用户ID
+        username: 用户名
+        email: 邮箱地址
+        from_peer: 是否来自其他工作进程的事件；共享缓存后端（如Redis）已由对方删除，不必重复删除
+    """
+    if not (from_peer and user_cache.backend.shared):
+        await user_cache.invalidate(user_id, username, email)
+    
+    if router is not None:
+        keys = [("id", user_id)]
+        if username is not None:
+            keys.append(("username", normalize_username(username)))
+        if email is not None:
+            keys.append(("email", normalize_email(email)))
+        router.mark_written(*keys)
+
+
+async def _after_user_write(db: AsyncSession, user_id: int, username: Optional[str] = None,
+                            email: Optional[str] = None):
+    """
+    用户数据写入后调用：使本进程的缓存失效，并广播给同一台机器上的其他工作进程
+    今后新增的资料修改、状态变更等写操作提交后都应调用此函数
+    
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        username: 用户名
+        email: 邮箱地址
+    """
+    await invalidate_user(db.info.get("router"), user_id, username, email)
+    invalidation_bus.publish("user", id=user_id, username=username, email=email)
+
+
+async def update_cached_last_logins(logins: Dict[int, datetime], from_peer: bool = False):
+    """
+    把写回数据库的最后登录时间直接更新到缓存的用户记录中
+    也用于处理其他工作进程广播的登录时间事件
+    
+    Args:
+        logins: 用户ID到最后登录时间的映射
+        from_peer: 是否来自其他工作进程的事件；共享缓存后端（如Redis）已由对方更新，不必重复更新
+    """
+    if not (from_peer and user_cache.backend.shared):
+        await user_cache.update_last_login(logins)
+
+
+async def after_last_login_flush(logins: Dict[int, datetime]):
+    """
+    最后登录时间写缓冲提交一批后调用：更新本进程缓存中的记录，
+    并把这一批登录时间合并成一个事件广播给其他工作进程。
+    登录时间是后台写回的，不删除缓存，也不把这些用户的读取切到主库
+    
+    Args:
+        logins: 本批用户ID到最后登录时间的映射
+    """
+    await update_cached_last_logins(logins)
+    items = [[user_id, login_time.isoformat()] for user_id, login_time in logins.items()]
+    for start in range(0, len(items), LAST_LOGIN_EVENT_BATCH):
+        invalidation_bus.publish("last_login", logins=items[start:start + LAST_LOGIN_EVENT_BATCH])
 
 
 class UserCRUD:
@@ -23,21 +242,21 @@ class UserCRUD:
     @staticmethod
     async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
         """
-        根据用户名获取用户
+        根据用户名获取用户（不区分大小写）
+        按规范化用户名的唯一索引查找，仍然是一次索引查找
         
         Args:
             db: 数据库会话
-            username: 用户名
+            username: 用户名（原始或已规范化的均可）
             
         Returns:
             Optional[User]: 用户对象，如果不存在则返回None
         """
         try:
-            # 构建查询语句
-            query = select(User).where(User.username == username)
-            result = await db.execute(query)
-            user = result.scalar_one_or_none()
-            return user
+            # 构建查询语句（可读从库）
+            username = normalize_username(username)
+            query = select(User).where(User.username_normalized == username)
+            return await _read_user(db, query, "username", username)
         except Exception as e:
             print(f"获取用户失败: {e}")
             return None
@@ -45,20 +264,19 @@ class UserCRUD:
     @staticmethod
     async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """
-        根据邮箱获取用户
+        根据邮箱获取用户（不区分大小写）
         
         Args:
             db: 数据库会话
-            email: 邮箱地址
+            email: 邮箱地址（原始或已规范化的均可）
             
         Returns:
             Optional[User]: 用户对象，如果不存在则返回None
         """
         try:
-            query = select(User).where(User.email == email)
-            result = await db.execute(query)
-            user = result.scalar_one_or_none()
-            return user
+            email = normalize_email(email)
+            query = select(User).where(User.email_normalized == email)
+            return await _read_user(db, query, "email", email)
         except Exception as e:
             print(f"获取用户失败: {e}")
             return None
@@ -77,59 +295,135 @@ class UserCRUD:
         """
         try:
             query = select(User).where(User.id == user_id)
-            result = await db.execute(query)
-            user = result.scalar_one_or_none()
-            return user
+            return await _read_user(db, query, "id", user_id)
+        except Exception as e:
+            print(f"获取用户失败: {e}")
+            return None
+    
+    @staticmethod
+    async def get_user_record_by_username(db: AsyncSession, username: str) -> Optional[UserRecord]:
+        """
+        根据用户名获取用户记录（不区分大小写，只查询需要的列，不创建ORM实体）
+        用于登录、/auth/me 等只读取用户数据的热点路径
+        
+        Args:
+            db: 数据库会话
+            username: 用户名（原始或已规范化的均可）
+            
+        Returns:
+            Optional[UserRecord]: 用户记录，如果不存在则返回None
+        """
+        try:
+            return await _read_record(db, "username", normalize_username(username))
+        except Exception as e:
+            print(f"获取用户失败: {e}")
+            return None
+    
+    @staticmethod
+    async def get_user_record_by_email(db: AsyncSession, email: str) -> Optional[UserRecord]:
+        """
+        根据邮箱获取用户记录（不区分大小写，只查询需要的列，不创建ORM实体）
+        可用于注册前检查邮箱是否已被使用
+        
+        Args:
+            db: 数据库会话
+            email: 邮箱地址（原始或已规范化的均可）
+            
+        Returns:
+            Optional[UserRecord]: 用户记录，如果不存在则返回None
+        """
+        try:
+            return await _read_record(db, "email", normalize_email(email))
+        except Exception as e:
+            print(f"获取用户失败: {e}")
+            return None
+    
+    @staticmethod
+    async def get_user_record_by_id(db: AsyncSession, user_id: int) -> Optional[UserRecord]:
+        """
+        根据用户ID获取用户记录（只查询需要的列，不创建ORM实体）
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            
+        Returns:
+            Optional[UserRecord]: 用户记录，如果不存在则返回None
+        """
+        try:
+            return await _read_record(db, "id", user_id)
         except Exception as e:
             print(f"获取用户失败: {e}")
             return None
     
     @staticmethod
-    async def create_user(db: AsyncSession, user_create: UserCreate) -> Optional[User]:
+    async def create_user(db: AsyncSession, user_create: UserCreate) -> Optional[UserRecord]:
         """
         创建新用户
+        不事先查询用户名和邮箱是否存在，直接插入，由唯一约束保证不重复：
+        只需一次INSERT（主键从插入结果中获取，不再refresh），也不存在查询和插入之间的竞争
         
         Args:
             db: 数据库会话
             user_create: 用户创建数据
             
         Returns:
-            Optional[User]: 创建的用户对象，如果失败则返回None
+            Optional[UserRecord]: 创建的用户记录，如果失败则返回None
+            
+        Raises:
+            DuplicateUserError: 用户名或邮箱已存在时抛出
         """
         try:
             # 加密密码
-            hashed_password = security_manager.hash_password(user_create.password)
+            hashed_password = await security_manager.hash_password_async(user_create.password)
             
-            # 创建用户对象
-            db_user = User(
-                username=user_create.username,
-                email=user_create.email,
-                hashed_password=hashed_password,
-                is_active=True,
-                created_at=datetime.utcnow()
-            )
+            values = {
+                "username": user_create.username,
+                "email": user_create.email,
+                **user_create.identity_columns(),
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "created_at": datetime.utcnow(),
+            }
             
-            # 添加到数据库
-            db.add(db_user)
+            # 插入数据库，使用数据库生成的主键
+            result = await db.execute(insert(User).values(**values))
             await db.commit()
-            await db.refresh(db_user)
             
-            return db_user
+            user_id = result.inserted_primary_key[0]
+            await _after_user_write(db, user_id, values["username"], values["email"])
+            return UserRecord(
+                id=user_id,
+                username=values["username"],
+                email=values["email"],
+                hashed_password=hashed_password,
+                is_active=True,
+                created_at=values["created_at"],
+                last_login=None,
+            )
             
         except IntegrityError as e:
-            # 处理唯一约束违反错误（用户名或邮箱已存在）
+            # 唯一约束违反：根据约束名称判断是用户名还是邮箱重复
             await db.rollback()
-            print(f"用户创建失败，可能是用户名或邮箱已存在: {e}")
+            field = duplicate_field(e)
+            if field:
+                raise DuplicateUserError(field)
+            print(f"用户创建失败: {e}")
             return None
+        except HashQueueFullError:
+            # 哈希工作池繁忙，交给上层返回503
+            raise
         except Exception as e:
             await db.rollback()
             print(f"用户创建失败: {e}")
             return None
     
     @staticmethod
-    async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[UserRecord]:
         """
         验证用户登录
+        只查询校验所需的列（不创建ORM实体），最后登录时间写入缓冲，
+        除了需要重新加密密码的情况外不产生任何写操作
         
         Args:
             db: 数据库会话
@@ -137,24 +431,44 @@ class UserCRUD:
             password: 密码
             
         Returns:
-            Optional[User]: 验证成功返回用户对象，否则返回None
+            Optional[UserRecord]: 验证成功返回用户记录（活跃用户的last_login为本次登录时间），否则返回None
         """
         try:
             # 获取用户
-            user = await UserCRUD.get_user_by_username(db, username)
+            user = await _read_record(db, "username", normalize_username(username))
             if not user:
                 return None
+            if user.hashed_password is None:
+                hashed_password = (await db.execute(_PASSWORD_HASH_QUERY, {"value": user.id})).scalar()
+                if hashed_password is None:
+                    return None
+                user = user._replace(hashed_password=hashed_password)
             
             # 验证密码
-            if not security_manager.verify_password(password, user.hashed_password):
+            if not await security_manager.verify_password_async(password, user.hashed_password):
                 return None
             
-            # 更新最后登录时间
-            user.last_login = datetime.utcnow()
-            await db.commit()
+            # 更新最后登录时间：只写入缓冲，由后台批量写回数据库（已禁用的账户会被拒绝登录，不记录）
+            login_time = user.last_login
+            if user.is_active:
+                login_time = datetime.utcnow()
+                last_login_buffer.record(user.id, login_time)
             
-            return user
+            # 哈希使用的是旧方案或旧参数时，借这次登录用当前参数重新加密（仅这种情况需要提交）
+            if security_manager.password_needs_update(user.hashed_password):
+                hashed_password = await security_manager.hash_password_async(password)
+                await db.execute(
+                    update(User).where(User.id == user.id).values(hashed_password=hashed_password)
+                )
+                await db.commit()
+                await _after_user_write(db, user.id, user.username, user.email)
+                user = user._replace(hashed_password=hashed_password)
+            
+            return user._replace(last_login=login_time)
             
+        except HashQueueFullError:
+            # 哈希工作池繁忙，交给上层返回503
+            raise
         except Exception as e:
             print(f"用户认证失败: {e}")
             return None
@@ -172,17 +486,331 @@ class UserCRUD:
             bool: 更新是否成功
         """
         try:
-            user = await UserCRUD.get_user_by_id(db, user_id)
-            if user:
-                user.last_login = datetime.utcnow()
-                await db.commit()
-                return True
-            return False
+            # 直接UPDATE，不先查询再修改；缓冲中该用户较旧的时间不再写回
+            last_login_buffer.discard(user_id)
+            result = await db.execute(
+                update(User).where(User.id == user_id).values(last_login=datetime.utcnow())
+            )
+            await db.commit()
+            await _after_user_write(db, user_id)
+            return result.rowcount > 0
         except Exception as e:
             await db.rollback()
             print(f"更新登录时间失败: {e}")
             return False
+    
+    @staticmethod
+    def _list_filters(is_active: Optional[bool] = None, created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None) -> List:
+        """
+        构建用户列表的过滤条件
+        """
+        conditions = []
+        if is_active is not None:
+            conditions.append(User.is_active == is_active)
+        if created_after is not None:
+            conditions.append(User.created_at >= created_after)
+        if created_before is not None:
+            conditions.append(User.created_at < created_before)
+        return conditions
+    
+    @staticmethod
+    async def stream_users(
+        db: AsyncSession,
+        after_id: int = 0,
+        limit: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[UserRecord]:
+        """
+        按ID顺序流式遍历用户（读从库）
+        每批用 id > 上一批最后ID 的键集条件查询，批内通过服务端游标逐行读取；
+        按列投影查询，结果行直接转换为 UserRecord，不创建ORM实体，也不进入会话的身份映射
+        
+        Args:
+            db: 数据库会话
+            after_id: 从该ID之后开始
+            limit: 最多返回多少个用户，不填表示不限制
+            is_active: 只返回活跃（True）或禁用（False）的用户
+            created_after: 只返回在该时间及之后注册的用户
+            created_before: 只返回在该时间之前注册的用户
+            batch_size: 每批查询的行数
+            
+        Yields:
+            UserRecord: 用户记录
+        """
+        conditions = UserCRUD._list_filters(is_active, created_after, created_before)
+        last_id = after_id
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            query = (
+                select(*USER_RECORD_COLUMNS)
+                .where(User.id > last_id, *conditions)
+                .order_by(User.id)
+                .limit(size)
+                .execution_options(yield_per=size, **{REPLICA_OPTION: True})
+            )
+            count = 0
+            async for row in await db.stream(query):
+                user = UserRecord._make(row)
+                last_id = user.id
+                count += 1
+                yield user
+            if remaining is not None:
+                remaining -= count
+            if count < size:
+                break
+    
+    @staticmethod
+    async def count_users(db: AsyncSession, is_active: Optional[bool] = None,
+                          created_after: Optional[datetime] = None,
+                          created_before: Optional[datetime] = None) -> int:
+        """
+        统计用户数量（在数据库中COUNT，读从库）
+        
+        Args:
+            db: 数据库会话
+            is_active: 只统计活跃（True）或禁用（False）的用户
+            created_after: 只统计在该时间及之后注册的用户
+            created_before: 只统计在该时间之前注册的用户
+            
+        Returns:
+            int: 用户数量
+        """
+        query = (
+            select(func.count())
+            .select_from(User)
+            .where(*UserCRUD._list_filters(is_active, created_after, created_before))
+            .execution_options(**{REPLICA_OPTION: True})
+        )
+        return (await db.execute(query)).scalar_one()
+    
+    @staticmethod
+    async def list_users_page(
+        db: AsyncSession,
+        fields: Sequence[str],
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        is_active: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, int]]]:
+        """
+        按注册时间倒序分页查询用户（键集分页，读从库）
+        排序键为 (created_at, id)，下一页条件写成 created_at < c OR (created_at = c AND id < i)，
+        配合 (created_at, id) 或 (is_active, created_at, id) 索引，每页都是一次索引范围扫描，
+        翻到多深耗时都不变
+        
+        Args:
+            db: 数据库会话
+            fields: 需要返回的列名
+            limit: 每页条数
+            after: 上一页最后一行的 (created_at, id)，不填表示第一页
+            is_active: 只返回活跃（True）或禁用（False）的用户
+            created_after: 只返回在该时间及之后注册的用户
+            created_before: 只返回在该时间之前注册的用户
+            
+        Returns:
+            Tuple: (本页用户字典列表, 下一页的 (created_at, id)，没有下一页时为None)
+        """
+        conditions = UserCRUD._list_filters(is_active, created_after, created_before)
+        if after is not None:
+            created_at, user_id = after
+            conditions.append(or_(
+                User.created_at < created_at,
+                and_(User.created_at == created_at, User.id < user_id),
+            ))
+        
+        # 排序键总是查询出来用于生成游标，但只返回请求的字段
+        columns = [getattr(User, name) for name in dict.fromkeys(["created_at", "id", *fields])]
+        query = (
+            select(*columns)
+            .where(*conditions)
+            .order_by(User.created_at.desc(), User.id.desc())
+            .limit(limit + 1)
+            .execution_options(**{REPLICA_OPTION: True})
+        )
+        rows = (await db.execute(query)).mappings().all()
+        
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]["created_at"], rows[-1]["id"])
+        return [{name: row[name] for name in fields} for row in rows], next_key
+
+    
+    @staticmethod
+    async def search_users(
+        db: AsyncSession,
+        field: str,
+        term: str,
+        limit: int = 20,
+        after: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """
+        按前缀搜索用户（键集分页，读从库）
+        只做前缀匹配（LIKE 'x%'），可以使用对应列的索引做范围扫描，不会全表扫描
+        
+        Args:
+            db: 数据库会话
+            field: 搜索字段（username、email 或 domain）
+            term: 搜索词
+            limit: 每页条数
+            after: 上一页最后一行的 (搜索列的值, id)，不填表示第一页
+            
+        Returns:
+            Tuple: (本页用户字典列表, 下一页的 (搜索列的值, id)，没有下一页时为None)
+            
+        Raises:
+            ValueError: 搜索字段不支持时抛出
+        """
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"不支持的搜索字段: {field}")
+        column, to_prefix = SEARCH_FIELDS[field]
+        
+        conditions = [column.startswith(to_prefix(term), autoescape=True)]
+        if after is not None:
+            value, user_id = after
+            conditions.append(or_(column > value, and_(column == value, User.id > user_id)))
+        
+        query = (
+            select(User.id, User.username, User.email, User.is_active, User.created_at, column.label("sort_key"))
+            .where(*conditions)
+            .order_by(column, User.id)
+            .limit(limit + 1)
+            .execution_options(**{REPLICA_OPTION: True})
+        )
+        rows = [dict(row) for row in (await db.execute(query)).mappings().all()]
+        
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]["sort_key"], rows[-1]["id"])
+        for row in rows:
+            del row["sort_key"]
+        return rows, next_key
+
+
+class RefreshTokenCRUD:
+    """
+    刷新令牌数据库操作类
+    刷新令牌自带用户ID和过期时间并带有签名，签发（登录）时不写数据库；
+    令牌被使用（续期或退出登录）时把它的摘要写入 refresh_tokens 表，主键冲突说明已经用过，
+    每个令牌只能使用一次
+    """
+    
+    @staticmethod
+    def create_refresh_token(user_id: int) -> str:
+        """
+        为用户签发新的刷新令牌（不访问数据库）
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            str: 刷新令牌
+        """
+        expires_at = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+        return security_manager.generate_refresh_token(user_id, expires_at)
+    
+    @staticmethod
+    async def _consume(db: AsyncSession, refresh_token: str) -> Optional[int]:
+        """
+        使用刷新令牌：校验签名和有效期后记录为已使用，由调用方提交
+        
+        Args:
+            db: 数据库会话
+            refresh_token: 刷新令牌
+            
+        Returns:
+            Optional[int]: 令牌所属的用户ID，令牌无效、已过期或已被使用时返回None
+        """
+        claims = security_manager.parse_refresh_token(refresh_token)
+        if claims is None:
+            return None
+        
+        user_id, expires_at = claims
+        if expires_at <= datetime.utcnow():
+            return None
+        token_hash = security_manager.hash_refresh_token(refresh_token)
+        try:
+            await db.execute(insert(RefreshToken).values(token_hash=token_hash, user_id=user_id, expires_at=expires_at))
+        except IntegrityError:
+            # 已被使用过（或用户已删除）
+            await db.rollback()
+            return None
+        return user_id
+    
+    @staticmethod
+    async def rotate_refresh_token(db: AsyncSession, refresh_token: str) -> Optional[Tuple[UserRecord, str]]:
+        """
+        使用刷新令牌续期：旧令牌作废，签发新令牌
+        
+        Args:
+            db: 数据库会话
+            refresh_token: 客户端提交的刷新令牌
+            
+        Returns:
+            Optional[Tuple[UserRecord, str]]: (用户记录, 新的刷新令牌)，令牌无效或已过期时返回None
+        """
+        try:
+            user_id = await RefreshTokenCRUD._consume(db, refresh_token)
+            await db.commit()
+            if user_id is None:
+                return None
+            
+            user = await _read_record(db, "id", user_id)
+            if user is None:
+                return None
+            return user, RefreshTokenCRUD.create_refresh_token(user.id)
+            
+        except Exception as e:
+            await db.rollback()
+            print(f"刷新令牌轮换失败: {e}")
+            return None
+
+    
+    @staticmethod
+    async def revoke_refresh_token(db: AsyncSession, refresh_token: str) -> bool:
+        """
+        作废刷新令牌（用户退出登录时调用）
+        
+        Args:
+            db: 数据库会话
+            refresh_token: 刷新令牌
+            
+        Returns:
+            bool: 是否作废了一个有效的刷新令牌
+        """
+        try:
+            user_id = await RefreshTokenCRUD._consume(db, refresh_token)
+            await db.commit()
+            return user_id is not None
+        except Exception as e:
+            await db.rollback()
+            print(f"作废刷新令牌失败: {e}")
+            return False
+    
+    @staticmethod
+    async def prune_expired(db: AsyncSession) -> int:
+        """
+        删除已过期的刷新令牌使用记录
+        过期的刷新令牌无论是否用过都会被拒绝，记录不再需要保留
+        
+        Args:
+            db: 数据库会话
+            
+        Returns:
+            int: 删除的记录数
+        """
+        result = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return result.rowcount or 0
 
 
 # 创建全局CRUD实例
-user_crud = UserCRUD()
\ No newline at end of file
+user_crud = UserCRUD()
+refresh_token_crud = RefreshTokenCRUD()
\ No newline at end of file
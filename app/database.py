@@ -5,15 +5,54 @@
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BINARY, ForeignKey, Index, event
+from sqlalchemy.engine import Engine, make_url
 from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
 import logging
 
+from app.query_stats import QueryStats
+from app.replicas import ReplicaRouter, RoutingSession
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# SQLite连接默认设置的PRAGMA（from_settings 按配置覆盖内存映射、页缓存和锁等待）
+SQLITE_PRAGMAS = {
+    # WAL：读不阻塞写、写不阻塞读；NORMAL在WAL下只在检查点时同步磁盘，掉电最多丢失最近的事务
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    # 内存映射读取的大小（字节）
+    "mmap_size": 268435456,
+    # 每个连接的页缓存，负数表示以KB为单位
+    "cache_size": -65536,
+    # 数据库被其他进程锁定时的最长等待时间（毫秒）
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+    # 搜索列都是规范化的小写值，区分大小写的 LIKE 'x%' 才能使用索引
+    "case_sensitive_like": "ON",
+}
+
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]):
+    """
+    每个新建的SQLite连接都先执行这些PRAGMA
+    
+    Args:
+        engine: 同步引擎（AsyncEngine.sync_engine）
+        pragmas: PRAGMA名称 -> 值
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
 class Base(DeclarativeBase):
     """
     数据库模型基类
@@ -28,6 +67,11 @@ class User(Base):
     定义了用户的基本信息字段
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # 用户列表按 (created_at, id) 键集分页，带状态过滤时使用第二个索引，每页都是索引范围扫描
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_active_created_at_id", "is_active", "created_at", "id"),
+    )
     
     # 主键ID，自动递增
     id = Column(Integer, primary_key=True, index=True, comment="用户唯一标识")
@@ -38,6 +82,15 @@ class User(Base):
     # 邮箱，唯一且不能为空
     email = Column(String(100), unique=True, index=True, nullable=False, comment="邮箱地址")
     
+    # 规范化（小写）用户名，唯一，用于不区分大小写的登录查询和前缀搜索
+    username_normalized = Column(String(50), unique=True, index=True, nullable=True, comment="规范化用户名")
+    
+    # 规范化（小写）邮箱，唯一，用于不区分大小写的邮箱查询和前缀搜索
+    email_normalized = Column(String(100), unique=True, index=True, nullable=True, comment="规范化邮箱")
+    
+    # 反转域名形式的邮箱（com.example@alice），用于按域名搜索
+    email_domain_reversed = Column(String(100), index=True, nullable=True, comment="反转域名邮箱")
+    
     # 加密后的密码
     hashed_password = Column(String(255), nullable=False, comment="加密后的密码")
     
@@ -54,40 +107,183 @@ class User(Base):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
 
 
+class RefreshToken(Base):
+    """
+    刷新令牌表模型
+    记录已使用（续期轮换或退出作废）的刷新令牌的HMAC摘要（定长32字节主键），
+    使用令牌时插入一行，主键冲突即说明令牌已被用过；过期后的记录可以删除
+    """
+    __tablename__ = "refresh_tokens"
+    
+    # 刷新令牌的HMAC-SHA256摘要
+    token_hash = Column(BINARY(32), primary_key=True, comment="刷新令牌摘要")
+    
+    # 所属用户
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, comment="用户ID")
+    
+    # 过期时间，之后记录由后台任务清理
+    expires_at = Column(DateTime, nullable=False, index=True, comment="过期时间")
+
+    def __repr__(self):
+        return f"<RefreshToken(user_id={self.user_id}, expires_at={self.expires_at})>"
+
+
+class RevokedToken(Base):
+    """
+    令牌吊销表模型
+    按jti记录被吊销的访问令牌，令牌过期后记录即可清理；
+    自增ID用于各工作进程增量同步
+    """
+    __tablename__ = "revoked_tokens"
+    
+    # 自增ID，增量同步的游标
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
+    
+    # 被吊销令牌的jti
+    jti = Column(String(36), unique=True, nullable=False, comment="令牌ID")
+    
+    # 令牌过期时间，之后记录可以清理
+    expires_at = Column(DateTime, nullable=False, index=True, comment="令牌过期时间")
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}', expires_at={self.expires_at})>"
+
+
 class DatabaseManager:
     """
     数据库管理器
     负责管理数据库连接、会话创建等
     """
     
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = 3600,
+        echo: bool = False,
+        query_stats: Optional[QueryStats] = None,
+        replica_urls: Sequence[str] = (),
+        replica_strategy: str = "round_robin",
+        read_your_writes_seconds: float = 5.0,
+        sqlite_pragmas: Optional[Dict[str, Any]] = None,
+        sqlite_reader_pool_size: int = 4,
+    ):
         """
         初始化数据库管理器
         
         Args:
             database_url: 数据库连接URL
+            pool_size: 连接池常驻连接数
+            max_overflow: 连接池允许临时超出的连接数
+            pool_timeout: 从连接池获取连接的最长等待时间（秒）
+            pool_recycle: 连接最长使用时间（秒），避免被MySQL的wait_timeout断开
+            echo: 是否在控制台输出SQL语句（仅用于本地调试，会同步格式化并输出每条语句）
+            query_stats: SQL耗时统计器（可选），用于记录慢查询和每条语句的耗时
+            replica_urls: 从库连接URL列表（可选），标记为可读从库的查询会分摊到这些从库
+            replica_strategy: 从库选择策略，"round_robin"（轮询）或"least_busy"（当前借出连接最少）
+            read_your_writes_seconds: 写入后多长时间内（秒）相关用户的读取仍走主库
+            sqlite_pragmas: SQLite连接的PRAGMA，不填时使用 SQLITE_PRAGMAS（仅SQLite）
+            sqlite_reader_pool_size: SQLite只读连接数，0表示读写共用一个连接（仅SQLite）
         """
         self.database_url = database_url
+        url = make_url(database_url)
+        self.is_sqlite = url.get_backend_name() == "sqlite"
         
         # 创建异步数据库引擎
-        # echo=True 会在控制台输出SQL语句，方便调试
-        self.engine = create_async_engine(
-            database_url,
-            echo=True,  # 开发环境建议设为True，生产环境设为False
+        # 每个工作进程最多占用 pool_size + max_overflow 个MySQL连接
+        engine_options = dict(
+            echo=echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
             pool_pre_ping=True,  # 连接池预检查，确保连接有效
         )
+        if self.is_sqlite:
+            # SQLite同一时间只允许一个写事务：主引擎只有一个连接，写操作在连接池中排队，
+            # 不会在数据库锁上忙等或报 database is locked；
+            # WAL模式下读不阻塞写，可读从库的查询交给只读引擎（作为从库注册到路由器）并发执行
+            engine_options.update(pool_size=1, max_overflow=0)
+            self.engine = create_async_engine(database_url, **engine_options)
+            pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+            _apply_sqlite_pragmas(self.engine.sync_engine, pragmas)
+            
+            self.replica_engines = []
+            # 内存数据库每个连接各是一个独立的库，不能拆分读写
+            if sqlite_reader_pool_size > 0 and url.database not in (None, "", ":memory:"):
+                reader = create_async_engine(
+                    database_url, **dict(engine_options, pool_size=sqlite_reader_pool_size)
+                )
+                _apply_sqlite_pragmas(reader.sync_engine, dict(pragmas, query_only="ON"))
+                self.replica_engines.append(reader)
+        else:
+            self.engine = create_async_engine(database_url, **engine_options)
+            # 每个从库各有一个连接池，连接数上限与主库相同
+            self.replica_engines = [create_async_engine(replica_url, **engine_options) for replica_url in replica_urls]
+        
+        # 注册SQL耗时统计
+        self.query_stats = query_stats
+        if query_stats is not None:
+            for engine in [self.engine, *self.replica_engines]:
+                query_stats.attach(engine.sync_engine)
+        
+        # 读写分离路由器：没有配置从库时所有查询都走主库
+        self.router = ReplicaRouter(
+            self.engine.sync_engine,
+            [engine.sync_engine for engine in self.replica_engines],
+            strategy=replica_strategy,
+            read_your_writes_seconds=read_your_writes_seconds,
+        )
         
         # 创建异步会话工厂
         self.async_session = async_sessionmaker(
             bind=self.engine,
             class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            info={"router": self.router},
             expire_on_commit=False  # 提交后不过期对象
         )
     
+    @classmethod
+    def from_settings(cls, settings) -> "DatabaseManager":
+        """
+        按应用配置创建数据库管理器
+        
+        Args:
+            settings: 应用配置
+            
+        Returns:
+            DatabaseManager: 数据库管理器
+        """
+        return cls(
+            settings.database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            echo=settings.db_echo,
+            query_stats=QueryStats(
+                slow_threshold_ms=settings.slow_query_threshold_ms,
+                sample_rate=settings.slow_query_sample_rate,
+            ) if settings.query_stats_enabled else None,
+            replica_urls=settings.replica_urls,
+            replica_strategy=settings.db_replica_strategy,
+            read_your_writes_seconds=settings.db_read_your_writes_seconds,
+            sqlite_pragmas=dict(
+                SQLITE_PRAGMAS,
+                mmap_size=settings.sqlite_mmap_size,
+                cache_size=-settings.sqlite_cache_size_kb,
+                busy_timeout=settings.sqlite_busy_timeout_ms,
+            ),
+            sqlite_reader_pool_size=settings.sqlite_reader_pool_size,
+        )
+    
     async def create_tables(self):
         """
-        创建所有数据库表
-        在首次运行应用时调用
+        按当前模型直接创建所有数据库表
+        只用于临时数据库（如基准测试）；正式数据库的表结构由 init_db.py 执行迁移创建和升级
         """
         try:
             async with self.engine.begin() as conn:
@@ -122,4 +318,6 @@ class DatabaseManager:
         在应用关闭时调用
         """
         await self.engine.dispose()
+        for engine in self.replica_engines:
+            await engine.dispose()
         logger.info("数据库连接已关闭")
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+公共依赖
+提供各路由共用的FastAPI依赖，例如数据库会话
+"""
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import DatabaseManager
+
+
+def get_db_manager(request: Request) -> DatabaseManager:
+    """
+    获取数据库管理器依赖
+    整个应用只有一个数据库管理器（一个连接池），由lifespan创建并保存在app.state中；
+    需要按需打开会话的接口（如缓存未命中时才查库）直接依赖它
+    
+    Args:
+        request: 当前请求
+        
+    Returns:
+        DatabaseManager: 应用共享的数据库管理器
+    """
+    return request.app.state.db_manager
+
+
+async def get_db(request: Request) -> AsyncSession:
+    """
+    获取数据库会话依赖
+    
+    Args:
+        request: 当前请求
+        
+    Yields:
+        AsyncSession: 数据库会话，请求结束后自动关闭
+    """
+    async for session in get_db_manager(request).get_session():
+        yield session
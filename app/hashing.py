@@ -0,0 +1,393 @@
+"""
+密码哈希工作池
+把bcrypt等CPU密集的密码哈希/校验放到独立的线程池或进程池中执行，
+避免阻塞事件循环，并提供排队深度限制和耗时统计
+"""
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+from passlib.context import CryptContext
+from passlib.hash import argon2, bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class HashQueueFullError(Exception):
+    """
+    哈希任务排队已满
+    当等待执行的哈希任务数超过上限时抛出，调用方应返回503让客户端稍后重试
+    """
+    pass
+
+
+# 进程池工作进程中由 init_worker_context 构建的CryptContext（主进程和线程池中为None）
+_worker_context: Optional[CryptContext] = None
+
+# 校准时bcrypt轮数的允许范围，低于10轮的安全余量不够
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+
+def build_context_options(
+    scheme: str = "bcrypt",
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 3,
+    argon2_memory_cost: int = 65536,
+    argon2_parallelism: int = 4,
+) -> Dict[str, Any]:
+    """
+    构建passlib CryptContext的配置
+    当前方案的参数被同时设为最小值和最大值，参数不同的旧哈希会被needs_update识别出来
+
+    Args:
+        scheme: 首选哈希方案，"bcrypt"或"argon2"
+        bcrypt_rounds: bcrypt工作因子（轮数）
+        argon2_time_cost: argon2迭代次数
+        argon2_memory_cost: argon2内存开销（KiB）
+        argon2_parallelism: argon2并行度
+
+    Returns:
+        Dict[str, Any]: CryptContext配置
+    """
+    if scheme not in ("bcrypt", "argon2"):
+        raise ValueError(f"不支持的密码哈希方案: {scheme}")
+    if scheme == "argon2" and not argon2.has_backend():
+        raise ValueError("使用argon2需要先安装argon2-cffi")
+
+    # 保留bcrypt，保证旧哈希仍然可以验证；非首选方案自动标记为过时
+    schemes = ["argon2", "bcrypt"] if scheme == "argon2" else ["bcrypt"]
+    options = {
+        "schemes": schemes,
+        "deprecated": "auto",
+        "bcrypt__default_rounds": bcrypt_rounds,
+        "bcrypt__min_rounds": bcrypt_rounds,
+        "bcrypt__max_rounds": bcrypt_rounds,
+    }
+    if scheme == "argon2":
+        options.update({
+            "argon2__time_cost": argon2_time_cost,
+            "argon2__memory_cost": argon2_memory_cost,
+            "argon2__parallelism": argon2_parallelism,
+        })
+    return options
+
+
+def _measure_verify(handler, samples: int) -> float:
+    """
+    测量指定哈希方案的校验耗时（中位数，毫秒）
+    """
+    probe = "calibration-probe-123"
+    hashed = handler.hash(probe)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify(probe, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt_rounds(target_ms: float, samples: int = 3) -> int:
+    """
+    在当前机器上选择bcrypt轮数
+    每加一轮耗时翻倍，选择校验耗时不超过目标值的最大轮数
+
+    Args:
+        target_ms: 目标校验耗时（毫秒）
+        samples: 每个轮数的测量次数
+
+    Returns:
+        int: 推荐的bcrypt轮数
+    """
+    best = BCRYPT_MIN_ROUNDS
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        elapsed = _measure_verify(bcrypt.using(rounds=rounds), samples)
+        logger.info(f"bcrypt校准: rounds={rounds} 校验耗时 {elapsed:.1f}ms")
+        if elapsed > target_ms:
+            break
+        best = rounds
+    return best
+
+
+def calibrate_argon2(target_ms: float, memory_cost: int = 65536, parallelism: int = 4,
+                     max_time_cost: int = 10, samples: int = 3) -> Dict[str, int]:
+    """
+    在当前机器上选择argon2参数
+    固定内存开销和并行度，选择校验耗时不超过目标值的最大迭代次数
+
+    Args:
+        target_ms: 目标校验耗时（毫秒）
+        memory_cost: 内存开销（KiB）
+        parallelism: 并行度
+        max_time_cost: 最大迭代次数
+        samples: 每组参数的测量次数
+
+    Returns:
+        Dict[str, int]: 推荐的argon2参数
+    """
+    if not argon2.has_backend():
+        raise ValueError("使用argon2需要先安装argon2-cffi")
+
+    best = 1
+    for time_cost in range(1, max_time_cost + 1):
+        handler = argon2.using(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        elapsed = _measure_verify(handler, samples)
+        logger.info(f"argon2校准: time_cost={time_cost} 校验耗时 {elapsed:.1f}ms")
+        if elapsed > target_ms:
+            break
+        best = time_cost
+    return {
+        "argon2_time_cost": best,
+        "argon2_memory_cost": memory_cost,
+        "argon2_parallelism": parallelism,
+    }
+
+
+def init_worker_context(config: str):
+    """
+    进程池工作进程的初始化函数
+    按主进程导出的配置在子进程中构建CryptContext，与主进程的（可能经过校准的）哈希参数一致；
+    子进程只需要passlib，不导入应用的配置和其他模块
+
+    Args:
+        config: CryptContext.to_string()导出的配置
+    """
+    global _worker_context
+    _worker_context = CryptContext.from_string(config)
+
+
+def _get_context() -> CryptContext:
+    """
+    获取当前进程使用的CryptContext
+    进程池工作进程使用初始化时构建的上下文，线程池直接使用主进程的上下文
+    """
+    if _worker_context is not None:
+        return _worker_context
+    from app.security import pwd_context
+    return pwd_context
+
+
+def hash_password(password: str) -> str:
+    """
+    在工作线程/进程中执行密码哈希
+    也可以直接交给以 init_worker_context 初始化的进程池批量执行（如批量导入脚本）
+
+    Args:
+        password: 原始密码
+
+    Returns:
+        str: 加密后的密码哈希
+    """
+    return _get_context().hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    在工作线程/进程中执行密码校验
+
+    Args:
+        plain_password: 用户输入的原始密码
+        hashed_password: 数据库中存储的加密密码
+
+    Returns:
+        bool: 密码是否正确
+    """
+    return _get_context().verify(plain_password, hashed_password)
+
+
+def _run_timed(func: Callable, *args) -> Tuple[Any, float, float]:
+    """
+    执行任务并记录开始和结束时间
+    使用time.monotonic()，同一台机器上的进程之间可以直接比较
+
+    Returns:
+        Tuple[Any, float, float]: (任务结果, 开始时间, 结束时间)
+    """
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class HashPoolStats:
+    """
+    哈希工作池统计信息
+    等待时间 = 提交任务到开始执行，运行时间 = 开始执行到执行完成
+    """
+
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def record(self, wait_time: float, run_time: float):
+        """
+        记录一次任务的耗时
+
+        Args:
+            wait_time: 排队等待时间（秒）
+            run_time: 执行时间（秒）
+        """
+        self.completed += 1
+        self.total_wait += wait_time
+        self.total_run += run_time
+        if wait_time > self.max_wait:
+            self.max_wait = wait_time
+        if run_time > self.max_run:
+            self.max_run = run_time
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        导出统计数据，时间单位为毫秒
+
+        Returns:
+            Dict[str, float]: 统计数据
+        """
+        completed = self.completed or 1
+        return {
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / completed * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_run_ms": round(self.total_run / completed * 1000, 3),
+            "max_run_ms": round(self.max_run * 1000, 3),
+        }
+
+
+class PasswordHasher:
+    """
+    异步密码哈希器
+    使用有大小限制的执行器运行哈希任务，事件循环只负责等待结果
+    """
+
+    def __init__(self, executor_type: str = "thread", max_workers: int = 0, max_queue: int = 64):
+        """
+        初始化密码哈希器
+
+        Args:
+            executor_type: 执行器类型，"thread"（线程池）或"process"（进程池）
+            max_workers: 工作线程/进程数，0表示使用CPU核心数
+            max_queue: 允许同时等待和执行的最大任务数，0表示不限制
+        """
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"不支持的执行器类型: {executor_type}")
+
+        self.executor_type = executor_type
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.stats = HashPoolStats()
+
+        # 执行器在第一次使用时才创建，避免导入模块时就启动进程
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        """
+        获取（必要时创建）执行器
+
+        Returns:
+            Executor: 线程池或进程池
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        from app.security import pwd_context
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            initializer=init_worker_context,
+                            initargs=(pwd_context.to_string(),)
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="password-hash"
+                        )
+                    logger.info(f"密码哈希工作池已启动: {self.executor_type} x {self.max_workers}")
+        return self._executor
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        """
+        提交任务到执行器并等待结果
+
+        Raises:
+            HashQueueFullError: 排队任务数超过上限时抛出
+        """
+        if self.max_queue and self._pending >= self.max_queue:
+            self.stats.rejected += 1
+            raise HashQueueFullError("密码哈希任务排队已满")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            submitted = time.monotonic()
+            result, started, finished = await loop.run_in_executor(
+                self._get_executor(), _run_timed, func, *args
+            )
+            self.stats.record(started - submitted, finished - started)
+            return result
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        异步加密密码
+
+        Args:
+            password: 原始密码
+
+        Returns:
+            str: 加密后的密码哈希
+        """
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        异步验证密码
+
+        Args:
+            plain_password: 用户输入的原始密码
+            hashed_password: 数据库中存储的加密密码
+
+        Returns:
+            bool: 密码是否正确
+        """
+        return await self._submit(_verify_password, plain_password, hashed_password)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取工作池统计信息
+
+        Returns:
+            Dict[str, float]: 包含队列深度、等待时间和运行时间的统计数据
+        """
+        data = self.stats.to_dict()
+        data.update({
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "queue_depth": self._pending,
+            "max_queue": self.max_queue,
+        })
+        return data
+
+    def shutdown(self, wait: bool = True):
+        """
+        关闭执行器
+        在应用关闭时调用
+
+        Args:
+            wait: 是否等待正在执行的任务完成
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,183 @@
+"""
+跨工作进程的缓存失效广播
+同一台机器上的每个工作进程在共享目录中绑定一个Unix数据报套接字，
+写操作发生后把失效事件直接发给其他进程的套接字，各进程在毫秒级内删除本地缓存中受影响的键。
+不需要额外的服务；Windows等不支持Unix数据报套接字的平台上自动关闭
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import socket
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SOCKET_SUFFIX = ".sock"
+# 单个事件的最大字节数（事件只包含少量键，远小于该值）
+MAX_EVENT_SIZE = 65536
+
+
+class InvalidationBus:
+    """
+    失效事件总线
+    事件是一个带 type 字段的JSON对象，按 type 分发给订阅的处理函数；
+    发布者自己不会收到自己的事件，本进程的缓存应在发布前直接处理
+    """
+
+    def __init__(self, directory: str, enabled: bool = True):
+        """
+        初始化事件总线
+
+        Args:
+            directory: 存放各工作进程套接字文件的目录
+            enabled: 是否启用；平台不支持Unix数据报套接字时始终关闭
+        """
+        self.directory = directory
+        self.enabled = enabled and hasattr(socket, "AF_UNIX")
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], Any]]] = {}
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    def subscribe(self, event_type: str, handler: Callable[[Dict[str, Any]], Any]):
+        """
+        订阅事件，处理函数可以是普通函数或协程函数
+
+        Args:
+            event_type: 事件类型
+            handler: 处理函数，参数为事件字典
+        """
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def start(self):
+        """
+        绑定本进程的套接字并开始接收事件
+        在应用启动时调用
+        """
+        if not self.enabled or self._socket is not None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f"worker-{os.getpid()}{SOCKET_SUFFIX}")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(self._path)
+        self._socket = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        logger.info(f"缓存失效广播已启动: {self._path}")
+
+    def stop(self):
+        """
+        停止接收事件并删除本进程的套接字文件
+        在应用关闭时调用
+        """
+        if self._socket is None:
+            return
+        self._loop.remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, event_type: str, **fields: Any):
+        """
+        向同一台机器上的其他工作进程广播事件
+        发送是非阻塞的：对方接收缓冲区已满时丢弃该事件（对方缓存按TTL自然过期）
+
+        Args:
+            event_type: 事件类型
+            fields: 事件内容，必须能被JSON序列化
+        """
+        if self._socket is None:
+            return
+
+        data = json.dumps({"type": event_type, **fields}, separators=(",", ":")).encode()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not name.endswith(SOCKET_SUFFIX) or path == self._path:
+                continue
+            try:
+                self._socket.sendto(data, path)
+                self.sent += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # 对方进程已退出，清理残留的套接字文件
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError) as e:
+                self.dropped += 1
+                logger.warning(f"发送缓存失效事件失败 {name}: {e}")
+
+    def _on_readable(self):
+        """
+        套接字可读时读取全部待处理的事件并分发
+        """
+        while self._socket is not None:
+            try:
+                data = self._socket.recv(MAX_EVENT_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.warning(f"接收缓存失效事件失败: {e}")
+                return
+
+            self.received += 1
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        """
+        把事件交给订阅的处理函数，协程处理函数在后台任务中执行
+        """
+        for handler in self._handlers.get(event.get("type"), ()):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    self._loop.create_task(result)
+            except Exception as e:
+                logger.error(f"处理缓存失效事件失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取事件总线统计信息
+
+        Returns:
+            Dict[str, Any]: 是否运行、发送/接收/丢弃的事件数
+        """
+        return {
+            "running": self._socket is not None,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+# 创建全局事件总线实例
+invalidation_bus = InvalidationBus(
+    settings.invalidation_bus_dir or os.path.join(tempfile.gettempdir(), "user_service_invalidation"),
+    enabled=settings.invalidation_bus_enabled,
+)
@@ -0,0 +1,182 @@
+"""
+最后登录时间写缓冲
+登录时只在内存中记录最后登录时间，定时或攒够一批后用一条
+UPDATE ... CASE 语句批量写回数据库，登录请求本身不再需要提交事务
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+import logging
+
+from sqlalchemy import case, update
+
+from app.config import settings
+from app.database import User
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    最后登录时间写缓冲
+    同一用户在一个刷新周期内多次登录只保留最新的时间，写入次数随之合并
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_entries: int = 500):
+        """
+        初始化写缓冲
+
+        Args:
+            flush_interval: 定时刷新间隔（秒）
+            max_entries: 缓冲的用户数达到该值时立即刷新，也是单条UPDATE包含的最大用户数
+        """
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending: Dict[int, datetime] = {}
+        self._db_manager = None
+        self._on_flushed: Optional[Callable[[Dict[int, datetime]], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # 锁在start()中创建，绑定到实际运行的事件循环
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.flushed_rows = 0
+        self.flush_count = 0
+
+    def record(self, user_id: int, login_time: datetime):
+        """
+        记录一次登录
+
+        Args:
+            user_id: 用户ID
+            login_time: 登录时间（UTC）
+        """
+        previous = self._pending.get(user_id)
+        if previous is None or login_time > previous:
+            self._pending[user_id] = login_time
+
+        # 攒够一批时立即在后台刷新，不阻塞当前请求
+        if len(self._pending) >= self.max_entries and self._db_manager is not None:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self.flush())
+
+    def discard(self, user_id: int):
+        """
+        丢弃某个用户尚未写入的登录时间（该用户的登录时间已被直接更新时调用）
+
+        Args:
+            user_id: 用户ID
+        """
+        self._pending.pop(user_id, None)
+
+    async def flush(self) -> int:
+        """
+        把缓冲的登录时间写入数据库
+
+        Returns:
+            int: 本次写入的用户数
+        """
+        if self._db_manager is None:
+            return 0
+
+        async with self._flush_lock:
+            written = 0
+            while self._pending:
+                # 取出一批，新的登录继续写入新的字典
+                batch = dict(list(self._pending.items())[:self.max_entries])
+                for user_id in batch:
+                    del self._pending[user_id]
+
+                try:
+                    statement = (
+                        update(User)
+                        .where(User.id.in_(list(batch)))
+                        .values(last_login=case(batch, value=User.id))
+                    )
+                    async for db in self._db_manager.get_session():
+                        await db.execute(statement)
+                        await db.commit()
+                        written += len(batch)
+                        if self._on_flushed is not None:
+                            await self._notify(batch)
+                except Exception as e:
+                    # 写入失败时放回缓冲，保留较新的时间，下次再试
+                    for user_id, login_time in batch.items():
+                        current = self._pending.get(user_id)
+                        if current is None or login_time > current:
+                            self._pending[user_id] = login_time
+                    logger.error(f"写入最后登录时间失败: {e}")
+                    break
+
+            if written:
+                self.flushed_rows += written
+                self.flush_count += 1
+            return written
+
+    async def _notify(self, batch: Dict[int, datetime]):
+        """
+        通知一批用户的登录时间已写入数据库（此时已提交，失败只记录日志，不再重试写入）
+        """
+        try:
+            await self._on_flushed(batch)
+        except Exception as e:
+            logger.error(f"处理已写入的最后登录时间失败: {e}")
+
+    async def _run(self):
+        """
+        定时刷新循环
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self, db_manager,
+              on_flushed: Optional[Callable[[Dict[int, datetime]], Awaitable[None]]] = None):
+        """
+        启动定时刷新
+        在应用启动时调用
+
+        Args:
+            db_manager: 数据库管理器
+            on_flushed: 每批登录时间提交后调用，参数为这批用户ID到登录时间的映射（用于更新用户缓存）
+        """
+        self._db_manager = db_manager
+        self._on_flushed = on_flushed
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        停止定时刷新，并把剩余的登录时间全部写入数据库
+        在应用关闭时、关闭数据库连接之前调用
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取写缓冲统计信息
+
+        Returns:
+            Dict[str, int]: 待写入数量、累计写入行数和刷新次数
+        """
+        return {
+            "pending": len(self._pending),
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+        }
+
+
+# 创建全局写缓冲实例
+last_login_buffer = LastLoginBuffer(
+    flush_interval=settings.last_login_flush_interval_seconds,
+    max_entries=settings.last_login_flush_max_entries,
+)
@@ -0,0 +1,110 @@
+"""
+登录限流与失败锁定
+基于共享内存计数器表，同一台机器上的所有工作进程共享计数，
+限额不会随工作进程数成倍放大，检查本身不产生网络或数据库I/O
+"""
+
+import math
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.shared_counters import SharedCounterTable
+
+
+class LoginThrottle:
+    """
+    登录限流器
+    - 按客户端IP限制单位时间内的登录尝试次数
+    - 按用户名统计连续失败次数，达到上限后在窗口期内锁定该账户的登录
+    """
+
+    def __init__(self, directory: str, ip_max_attempts: int = 30, ip_window_seconds: float = 60.0,
+                 max_failures: int = 5, lockout_window_seconds: float = 900.0, slots: int = 65536):
+        """
+        初始化登录限流器
+
+        Args:
+            directory: 计数器文件目录，同一台机器上的工作进程必须相同
+            ip_max_attempts: 每个IP在窗口内允许的登录尝试次数，0表示不限制
+            ip_window_seconds: IP限流窗口（秒）
+            max_failures: 每个用户名在窗口内允许的失败次数，0表示不锁定
+            lockout_window_seconds: 失败计数窗口（秒），也是锁定时长的上限
+            slots: 每张计数器表的槽位数
+        """
+        self.ip_max_attempts = ip_max_attempts
+        self.max_failures = max_failures
+        self.attempts = SharedCounterTable(
+            os.path.join(directory, "login_attempts.bin"), ip_window_seconds, slots=slots
+        ) if ip_max_attempts else None
+        self.failures = SharedCounterTable(
+            os.path.join(directory, "login_failures.bin"), lockout_window_seconds, slots=slots
+        ) if max_failures else None
+        self.throttled = 0
+        self.locked_out = 0
+
+    def check(self, client_ip: Optional[str], username: str) -> Optional[Tuple[str, int]]:
+        """
+        登录前检查，并计入一次该IP的登录尝试
+
+        Args:
+            client_ip: 客户端IP
+            username: 用户名
+
+        Returns:
+            Optional[Tuple[str, int]]: 被限制时返回(原因, 建议重试等待秒数)，否则返回None
+        """
+        if self.failures is not None and self.failures.count(f"user:{username}") >= self.max_failures:
+            self.locked_out += 1
+            return "登录失败次数过多，账户已被临时锁定", math.ceil(self.failures.window_seconds)
+
+        if self.attempts is not None and client_ip:
+            if self.attempts.increment(f"ip:{client_ip}") > self.ip_max_attempts:
+                self.throttled += 1
+                # 最早的时间桶移出窗口后即可再次尝试
+                return "登录尝试过于频繁，请稍后重试", math.ceil(self.attempts.bucket_width)
+        return None
+
+    def record_failure(self, username: str):
+        """
+        记录一次登录失败（用户名不存在时同样计数，避免暴露用户是否存在）
+
+        Args:
+            username: 用户名
+        """
+        if self.failures is not None:
+            self.failures.increment(f"user:{username}")
+
+    def record_success(self, username: str):
+        """
+        登录成功后清空该用户名的失败计数
+
+        Args:
+            username: 用户名
+        """
+        if self.failures is not None:
+            self.failures.reset(f"user:{username}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取限流统计信息（本进程）
+
+        Returns:
+            Dict[str, int]: 被限流和被锁定拒绝的次数
+        """
+        return {
+            "throttled": self.throttled,
+            "locked_out": self.locked_out,
+        }
+
+
+# 创建全局登录限流器实例
+login_throttle = LoginThrottle(
+    settings.shared_counters_dir or os.path.join(tempfile.gettempdir(), "user_service_counters"),
+    ip_max_attempts=settings.login_ip_max_attempts,
+    ip_window_seconds=settings.login_ip_window_seconds,
+    max_failures=settings.login_lockout_max_failures,
+    lockout_window_seconds=settings.login_lockout_window_seconds,
+    slots=settings.shared_counters_slots,
+) if settings.login_throttle_enabled else None
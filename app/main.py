@@ -3,20 +3,53 @@ FastAPI主应用文件
 整合所有组件，配置路由、中间件等
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+from datetime import datetime
+import hashlib
+import json
 import logging
 
 from app.config import settings
 from app.database import DatabaseManager
+from app.migrations import LATEST_VERSION, get_schema_version
 from app.auth import router as auth_router
+from app.users import router as users_router
+from app.security import password_hasher, security_manager, token_cache, revocation_list
+from app.last_login import last_login_buffer
+from app.user_cache import user_cache
+from app.invalidation import invalidation_bus
+from app.crud import after_last_login_flush, invalidate_user, refresh_token_crud, update_cached_last_logins
+from app.login_throttle import login_throttle
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def prune_refresh_tokens(db_manager, interval: float):
+    """
+    定期删除已过期的刷新令牌使用记录
+    
+    Args:
+        db_manager: 数据库管理器
+        interval: 清理间隔（秒）
+    """
+    while True:
+        try:
+            async for db in db_manager.get_session():
+                pruned = await refresh_token_crud.prune_expired(db)
+                if pruned:
+                    logger.info(f"已清理 {pruned} 条过期的刷新令牌记录")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"清理过期刷新令牌记录失败: {e}")
+        await asyncio.sleep(interval)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -26,15 +59,49 @@ async def lifespan(app: FastAPI):
     # 启动时执行
     logger.info("正在启动用户服务API...")
     
-    # 初始化数据库
-    db_manager = DatabaseManager(settings.database_url)
+    # 初始化数据库：整个应用共用这一个数据库管理器（一个连接池），
+    # 请求通过 app.dependencies.get_db 获取会话
+    db_manager = DatabaseManager.from_settings(settings)
+    app.state.db_manager = db_manager
+    # 表结构由 init_db.py 迁移，启动时只读取一行版本号确认已迁移到最新
     try:
-        await db_manager.create_tables()
-        logger.info("数据库表初始化完成")
+        schema_version = await get_schema_version(db_manager.engine)
     except Exception as e:
-        logger.error(f"数据库初始化失败: {e}")
-        # 注意：这里不抛出异常，允许应用继续启动
-        # 在实际生产环境中，您可能希望在数据库连接失败时停止应用
+        schema_version = None
+        logger.error(f"检查数据库结构版本失败: {e}")
+        # 数据库暂时无法连接时无法确认版本：记录错误后继续启动，请求会在连接恢复后正常处理；
+        # 只有确认结构版本落后时才拒绝启动
+    if schema_version is not None:
+        if schema_version < LATEST_VERSION:
+            # 查询依赖迁移新增的列（如规范化用户名），在旧结构上运行会让已有用户无法登录，拒绝启动
+            await db_manager.close()
+            raise RuntimeError(
+                f"数据库结构版本为 {schema_version}，需要 {LATEST_VERSION}，请先运行 python init_db.py"
+            )
+        logger.info(f"数据库结构版本: {schema_version}")
+    
+    # 启动令牌吊销列表的后台同步
+    revocation_list.start(
+        db_manager,
+        sync_interval=settings.revocation_sync_interval_seconds,
+        prune_interval=settings.revocation_prune_interval_seconds,
+    )
+    # 定期清理过期的刷新令牌使用记录
+    refresh_token_prune_task = asyncio.create_task(
+        prune_refresh_tokens(db_manager, settings.refresh_token_prune_interval_seconds)
+    )
+    # 启动最后登录时间的批量写回，每批提交后更新缓存中这些用户的登录时间
+    last_login_buffer.start(db_manager, on_flushed=after_last_login_flush)
+    
+    # 接收其他工作进程广播的事件：删除本地用户缓存、更新缓存中的登录时间、加入吊销列表
+    invalidation_bus.subscribe("user", lambda event: invalidate_user(
+        db_manager.router, event["id"], event.get("username"), event.get("email"), from_peer=True
+    ))
+    invalidation_bus.subscribe("last_login", lambda event: update_cached_last_logins(
+        {user_id: datetime.fromisoformat(login_time) for user_id, login_time in event["logins"]}, from_peer=True
+    ))
+    invalidation_bus.subscribe("revoke", lambda event: revocation_list.add(event["jti"], event["exp"]))
+    invalidation_bus.start()
     
     logger.info("用户服务API启动完成")
     
@@ -42,12 +109,25 @@ async def lifespan(app: FastAPI):
     
     # 关闭时执行
     logger.info("正在关闭用户服务API...")
+    invalidation_bus.stop()
+    await revocation_list.stop()
+    refresh_token_prune_task.cancel()
+    try:
+        await refresh_token_prune_task
+    except asyncio.CancelledError:
+        pass
+    # 关闭连接池之前写回缓冲中剩余的登录时间
+    await last_login_buffer.stop()
     try:
         await db_manager.close()
         logger.info("数据库连接已关闭")
     except Exception as e:
         logger.error(f"关闭数据库连接时发生错误: {e}")
     
+    # 关闭用户缓存后端的连接和密码哈希工作池
+    await user_cache.close()
+    password_hasher.shutdown()
+    
     logger.info("用户服务API已关闭")
 
 
@@ -126,12 +206,42 @@ async def system_health():
         "version": settings.app_version,
         "status": "running",
         "database": "connected",  # 在实际应用中，这里应该检查真实的数据库连接状态
+        "password_hashing": password_hasher.get_stats(),
+        "token_cache": token_cache.get_stats(),
+        "user_cache": user_cache.get_stats(),
+        "invalidation_bus": invalidation_bus.get_stats(),
+        "login_throttle": login_throttle.get_stats() if login_throttle is not None else None,
+        "token_revocation": revocation_list.get_stats(),
+        "last_login_buffer": last_login_buffer.get_stats(),
+        "database_routing": app.state.db_manager.router.get_stats(),
         "timestamp": "2024-01-01T00:00:00Z"  # 可以返回当前时间戳
     }
 
 
+# JWKS文档在启动时序列化一次，密钥轮换需要重启服务
+_jwks_body = json.dumps(security_manager.get_jwks(), separators=(",", ":")).encode()
+_jwks_etag = f'"{hashlib.sha256(_jwks_body).hexdigest()[:32]}"'
+
+
+@app.get("/.well-known/jwks.json", tags=["系统"], summary="令牌验证公钥")
+async def jwks(request: Request):
+    """
+    令牌验证公钥集合（JWKS）
+    其他服务下载并缓存公钥后，可以在本地验证令牌，不必每次回调本服务；
+    遇到未知的kid时再重新获取即可拿到轮换后的新公钥
+    """
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}, stale-while-revalidate=60",
+        "ETag": _jwks_etag,
+    }
+    if request.headers.get("if-none-match") == _jwks_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=_jwks_body, media_type="application/json", headers=headers)
+
+
 # 注册路由
 app.include_router(auth_router, prefix=settings.api_v1_prefix)
+app.include_router(users_router, prefix=settings.api_v1_prefix)
 
 
 # 全局异常处理器
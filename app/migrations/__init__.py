@@ -0,0 +1,170 @@
+"""
+数据库结构迁移
+每个迁移脚本是本包中名为 vNNNN_说明.py 的模块，按编号顺序执行，模块中定义：
+- DESCRIPTION: 迁移说明
+- upgrade(conn): 同步函数，在迁移连接上执行结构变更
+
+已执行到的版本号保存在 schema_version 表的唯一一行中。
+迁移由 init_db.py 执行（部署时运行一次）；工作进程启动时只读取这一行检查版本，
+不再每次启动都用 create_all 检查每张表
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# 版本表独立于模型的元数据，不受 create_all 影响
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False, comment="固定为1"),
+    Column("version", Integer, nullable=False, comment="已执行到的迁移版本"),
+    Column("updated_at", DateTime, nullable=False, comment="最后一次迁移时间"),
+)
+
+# MySQL命名锁：多个部署进程同时执行迁移时只有一个真正执行
+MIGRATION_LOCK = "user_service_schema_migration"
+MIGRATION_LOCK_TIMEOUT = 300
+
+_MODULE_PATTERN = re.compile(r"^v(\d{4})_\w+$")
+
+
+class Migration(NamedTuple):
+    """
+    一个迁移脚本
+    """
+    version: int
+    name: str
+    description: str
+    upgrade: object
+
+
+def load_migrations() -> List[Migration]:
+    """
+    按编号顺序加载本包中的全部迁移脚本
+
+    Returns:
+        List[Migration]: 迁移列表
+
+    Raises:
+        RuntimeError: 版本号重复或不连续时抛出
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), module_info.name, module.DESCRIPTION, module.upgrade))
+
+    migrations.sort(key=lambda migration: migration.version)
+    for expected, migration in enumerate(migrations, 1):
+        if migration.version != expected:
+            raise RuntimeError(f"迁移版本不连续：期望 {expected}，实际为 {migration.name}")
+    return migrations
+
+
+MIGRATIONS = load_migrations()
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def _read_version(conn: Connection) -> int:
+    """
+    读取当前版本（版本表还没有记录时视为0）
+    """
+    version = conn.execute(select(schema_version.c.version).where(schema_version.c.id == 1)).scalar()
+    return version or 0
+
+
+def _read_version_if_present(conn: Connection) -> int:
+    """
+    版本表存在时读取版本，否则返回0
+    只把“尚未迁移”视为0，连接失败等数据库错误照常抛出
+    """
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return _read_version(conn)
+
+
+def _write_version(conn: Connection, version: int):
+    """
+    写入当前版本
+    """
+    values = {"version": version, "updated_at": datetime.utcnow()}
+    result = conn.execute(schema_version.update().where(schema_version.c.id == 1).values(**values))
+    if result.rowcount == 0:
+        conn.execute(schema_version.insert().values(id=1, **values))
+
+
+def _migrate_sync(conn: Connection, target: Optional[int]) -> Tuple[int, int]:
+    """
+    在同步连接上执行迁移（由 migrate 通过 run_sync 调用）
+    每个迁移完成后立即记录版本：MySQL的DDL会隐式提交，中断后从下一个迁移继续
+    """
+    target = LATEST_VERSION if target is None else target
+    version_metadata.create_all(conn)
+    conn.commit()
+
+    is_mysql = conn.dialect.name == "mysql"
+    if is_mysql:
+        locked = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"), {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT}
+        ).scalar()
+        if locked != 1:
+            raise RuntimeError("等待其他进程完成迁移超时")
+    try:
+        start = current = _read_version(conn)
+        for migration in MIGRATIONS:
+            if migration.version <= current or migration.version > target:
+                continue
+            logger.info(f"执行迁移 {migration.name}: {migration.description}")
+            migration.upgrade(conn)
+            _write_version(conn, migration.version)
+            conn.commit()
+            current = migration.version
+        return start, current
+    finally:
+        if is_mysql:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
+
+
+async def migrate(engine: AsyncEngine, target: Optional[int] = None) -> Tuple[int, int]:
+    """
+    把数据库迁移到目标版本
+
+    Args:
+        engine: 主库引擎
+        target: 目标版本，不填表示最新版本
+
+    Returns:
+        Tuple[int, int]: (迁移前版本, 迁移后版本)
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(_migrate_sync, target)
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """
+    读取数据库当前的结构版本（只查询版本表的一行）
+
+    Args:
+        engine: 主库引擎
+
+    Returns:
+        int: 当前版本，尚未执行过迁移时返回0
+
+    Raises:
+        sqlalchemy.exc.DBAPIError: 无法连接数据库或查询失败
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(_read_version_if_present)
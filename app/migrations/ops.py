@@ -0,0 +1,72 @@
+"""
+迁移脚本使用的结构变更操作
+MySQL上加列、加索引使用在线DDL（ALGORITHM=INPLACE, LOCK=NONE），执行期间不阻塞读写；
+其他数据库（如SQLite）使用普通DDL。所有操作都先检查对象是否已存在，迁移中断后可以重新执行
+"""
+
+from typing import Sequence
+
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+# MySQL在线DDL选项：不复制表、不加表锁
+ONLINE_DDL = "ALGORITHM=INPLACE, LOCK=NONE"
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    """
+    表中是否已有该列
+    """
+    return any(info["name"] == column for info in inspect(conn).get_columns(table))
+
+
+def has_index(conn: Connection, table: str, name: str) -> bool:
+    """
+    表中是否已有该索引
+    """
+    return any(info["name"] == name for info in inspect(conn).get_indexes(table))
+
+
+def add_column(conn: Connection, table: str, column: Column):
+    """
+    加列（已存在时跳过）
+
+    Args:
+        conn: 迁移连接
+        table: 表名
+        column: 列定义（需可为空或带服务端默认值，才能在线添加）
+    """
+    if has_column(conn, table, column.name):
+        return
+    ddl = f"ALTER TABLE {_quote(conn, table)} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"
+    if conn.dialect.name == "mysql":
+        ddl += f", {ONLINE_DDL}"
+    conn.execute(text(ddl))
+
+
+def add_index(conn: Connection, table: str, name: str, columns: Sequence[str], unique: bool = False):
+    """
+    加索引（已存在时跳过）
+
+    Args:
+        conn: 迁移连接
+        table: 表名
+        name: 索引名
+        columns: 索引列
+        unique: 是否唯一索引
+    """
+    if has_index(conn, table, name):
+        return
+    column_list = ", ".join(_quote(conn, column) for column in columns)
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if conn.dialect.name == "mysql":
+        ddl = (f"ALTER TABLE {_quote(conn, table)} ADD {kind} {_quote(conn, name)} ({column_list}), "
+               f"{ONLINE_DDL}")
+    else:
+        ddl = f"CREATE {kind} {_quote(conn, name)} ON {_quote(conn, table)} ({column_list})"
+    conn.execute(text(ddl))
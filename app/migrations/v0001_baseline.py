@@ -0,0 +1,47 @@
+"""
+初始结构：用户表、刷新令牌表、令牌吊销表
+已经用 create_all 建好表的数据库执行时只补建缺少的表
+"""
+
+from datetime import datetime
+
+from sqlalchemy import BINARY, Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "创建用户表、刷新令牌表和令牌吊销表"
+
+# 迁移描述的是当时的结构，不引用会继续演进的模型类
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True, comment="用户唯一标识"),
+    Column("username", String(50), unique=True, index=True, nullable=False, comment="用户名"),
+    Column("email", String(100), unique=True, index=True, nullable=False, comment="邮箱地址"),
+    Column("hashed_password", String(255), nullable=False, comment="加密后的密码"),
+    Column("is_active", Boolean, default=True, comment="用户状态"),
+    Column("created_at", DateTime, default=datetime.utcnow, comment="创建时间"),
+    Column("last_login", DateTime, nullable=True, comment="最后登录时间"),
+)
+
+Table(
+    "refresh_tokens",
+    metadata,
+    Column("token_hash", BINARY(32), primary_key=True, comment="刷新令牌摘要"),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True,
+           comment="用户ID"),
+    Column("expires_at", DateTime, nullable=False, comment="过期时间"),
+)
+
+Table(
+    "revoked_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True, comment="记录ID"),
+    Column("jti", String(36), unique=True, nullable=False, comment="令牌ID"),
+    Column("expires_at", DateTime, nullable=False, index=True, comment="令牌过期时间"),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,14 @@
+"""
+用户列表的键集分页索引
+"""
+
+from sqlalchemy.engine import Connection
+
+from app.migrations.ops import add_index
+
+DESCRIPTION = "为用户列表添加 (created_at, id) 和 (is_active, created_at, id) 索引"
+
+
+def upgrade(conn: Connection):
+    add_index(conn, "users", "ix_users_created_at_id", ["created_at", "id"])
+    add_index(conn, "users", "ix_users_active_created_at_id", ["is_active", "created_at", "id"])
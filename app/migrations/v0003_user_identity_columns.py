@@ -0,0 +1,90 @@
+"""
+规范化身份列：不区分大小写的用户名、邮箱查询，以及按邮箱前缀、域名搜索
+先在线加列，再按主键分批回填，最后在线建索引
+"""
+
+from typing import Dict
+
+from sqlalchemy import Column, String, bindparam, column, func, select, table, update
+from sqlalchemy.engine import Connection
+
+from app.migrations.ops import add_column, add_index
+
+DESCRIPTION = "添加并回填 username_normalized、email_normalized、email_domain_reversed 列及索引"
+
+# 每批回填的行数，每批单独提交，避免长事务
+BACKFILL_BATCH_SIZE = 1000
+
+users = table(
+    "users",
+    column("id"),
+    column("username"),
+    column("email"),
+    column("username_normalized"),
+    column("email_normalized"),
+    column("email_domain_reversed"),
+)
+
+
+def identity_columns(username: str, email: str) -> Dict[str, str]:
+    """
+    计算规范化列（写迁移时 app.schemas 中规则的固定副本）
+    迁移不引用会继续演进的应用代码，之后修改规范化规则不会改变本迁移写入的值
+    """
+    email = email.strip().lower()
+    local, _, domain = email.rpartition("@")
+    return {
+        "username_normalized": username.strip().lower(),
+        "email_normalized": email,
+        "email_domain_reversed": ".".join(reversed(domain.split("."))) + "@" + local,
+    }
+
+
+def backfill(conn: Connection):
+    """
+    按主键顺序分批回填规范化列
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(users.c.id, users.c.username, users.c.email)
+            .where(users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        conn.execute(
+            update(users).where(users.c.id == bindparam("row_id")),
+            [{"row_id": row.id, **identity_columns(row.username, row.email)} for row in rows],
+        )
+        conn.commit()
+        last_id = rows[-1].id
+
+
+def check_duplicates(conn: Connection, name: str):
+    """
+    建唯一索引前检查只有大小写不同的重复值，给出可处理的错误信息
+    """
+    normalized = users.c[name]
+    duplicates = conn.execute(
+        select(normalized).group_by(normalized).having(func.count() > 1).limit(10)
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"{name} 存在只有大小写不同的重复值，需要先手动处理后再执行迁移: {', '.join(duplicates)}"
+        )
+
+
+def upgrade(conn: Connection):
+    add_column(conn, "users", Column("username_normalized", String(50), nullable=True, comment="规范化用户名"))
+    add_column(conn, "users", Column("email_normalized", String(100), nullable=True, comment="规范化邮箱"))
+    add_column(conn, "users", Column("email_domain_reversed", String(100), nullable=True, comment="反转域名邮箱"))
+
+    backfill(conn)
+
+    check_duplicates(conn, "username_normalized")
+    check_duplicates(conn, "email_normalized")
+    add_index(conn, "users", "ix_users_username_normalized", ["username_normalized"], unique=True)
+    add_index(conn, "users", "ix_users_email_normalized", ["email_normalized"], unique=True)
+    add_index(conn, "users", "ix_users_email_domain_reversed", ["email_domain_reversed"])
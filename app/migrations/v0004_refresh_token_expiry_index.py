@@ -0,0 +1,14 @@
+"""
+刷新令牌过期时间索引
+后台清理任务按 expires_at 删除过期的刷新令牌记录，有索引时只扫描过期的行
+"""
+
+from sqlalchemy.engine import Connection
+
+from app.migrations.ops import add_index
+
+DESCRIPTION = "为 refresh_tokens 添加 expires_at 索引"
+
+
+def upgrade(conn: Connection):
+    add_index(conn, "refresh_tokens", "ix_refresh_tokens_expires_at", ["expires_at"])
@@ -0,0 +1,165 @@
+"""
+SQL执行耗时统计
+通过SQLAlchemy事件记录每条（归一化后的）SQL语句的执行次数和耗时，
+只有超过阈值的慢查询才写日志，并可按比例采样，避免日志开销拖慢正常请求
+"""
+
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 归一化规则：字符串和数字字面量替换为?，IN列表折叠，空白合并
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_statement(statement: str) -> str:
+    """
+    归一化SQL语句，使参数不同的同一类语句聚合到一起
+    SQLAlchemy会复用编译后的语句字符串，结果缓存后大部分调用只是一次字典查询
+
+    Args:
+        statement: 原始SQL语句
+
+    Returns:
+        str: 归一化后的SQL语句
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class StatementTiming:
+    """
+    单条归一化语句的耗时汇总
+    """
+
+    __slots__ = ("count", "total", "max", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+
+class QueryStats:
+    """
+    SQL执行耗时统计器
+    """
+
+    def __init__(self, slow_threshold_ms: float = 200.0, sample_rate: float = 1.0,
+                 max_statements: int = 1000):
+        """
+        初始化统计器
+
+        Args:
+            slow_threshold_ms: 慢查询阈值（毫秒），超过阈值的语句才写日志
+            sample_rate: 慢查询日志采样率（0~1）
+            max_statements: 最多统计多少种不同的语句，超出后新语句只计入“其他”
+        """
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_statements = max_statements
+        self._timings: Dict[str, StatementTiming] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine):
+        """
+        在引擎上注册事件监听
+        异步引擎请传入 async_engine.sync_engine
+
+        Args:
+            engine: SQLAlchemy同步引擎
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        self.record(statement, time.perf_counter() - started)
+
+    def _handle_error(self, exception_context):
+        # 执行失败时弹出开始时间，保持栈平衡
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+    def record(self, statement: str, elapsed: float):
+        """
+        记录一次语句执行
+
+        Args:
+            statement: SQL语句
+            elapsed: 执行耗时（秒）
+        """
+        key = normalize_statement(statement)
+        is_slow = elapsed >= self.slow_threshold
+
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                if len(self._timings) >= self.max_statements:
+                    key = "<other>"
+                    timing = self._timings.get(key)
+                if timing is None:
+                    timing = self._timings[key] = StatementTiming()
+            timing.count += 1
+            timing.total += elapsed
+            if elapsed > timing.max:
+                timing.max = elapsed
+            if is_slow:
+                timing.slow += 1
+
+        if is_slow and (self.sample_rate >= 1.0 or random.random() < self.sample_rate):
+            logger.warning(f"慢查询 {elapsed * 1000:.1f}ms: {key}")
+
+    def snapshot(self, top: Optional[int] = None, order_by: str = "total_ms") -> List[Dict[str, float]]:
+        """
+        获取汇总后的语句耗时
+
+        Args:
+            top: 只返回前N条，不填返回全部
+            order_by: 排序字段（total_ms、max_ms、avg_ms、count、slow）
+
+        Returns:
+            List[Dict[str, float]]: 每条语句的执行次数、总耗时、平均耗时、最大耗时和慢查询次数
+        """
+        with self._lock:
+            rows = [
+                {
+                    "statement": statement,
+                    "count": timing.count,
+                    "total_ms": round(timing.total * 1000, 3),
+                    "avg_ms": round(timing.total / timing.count * 1000, 3),
+                    "max_ms": round(timing.max * 1000, 3),
+                    "slow": timing.slow,
+                }
+                for statement, timing in self._timings.items()
+            ]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:top] if top else rows
+
+    def reset(self):
+        """
+        清空统计数据
+        """
+        with self._lock:
+            self._timings.clear()
@@ -0,0 +1,31 @@
+"""
+轻量用户记录
+认证、/auth/me 等热点路径只需要用户的几列数据，用列投影查询直接得到元组，
+不创建ORM实体，也不经过会话的身份映射。
+UserRecord 基于元组、没有实例字典（__slots__ 为空），不可变，
+用户查询缓存和批量导出脚本都保存这种记录，每个用户占用的内存只有ORM实体的几分之一
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.database import User
+
+
+class UserRecord(NamedTuple):
+    """
+    只读的用户记录（按列投影查询的一行）
+    字段名与 User 模型一致，用 UserResponse.from_record 转换为响应。
+    从Redis等序列化缓存后端读出的记录不含密码哈希（hashed_password为None），需要时另行查询
+    """
+    id: int
+    username: str
+    email: str
+    hashed_password: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+
+# 与 UserRecord 字段顺序一致的列，查询结果行可以直接 UserRecord._make(row)
+USER_RECORD_COLUMNS = tuple(getattr(User, field) for field in UserRecord._fields)
@@ -0,0 +1,148 @@
+"""
+读写分离
+把只读查询路由到MySQL从库，写操作和事务内的后续读取始终走主库，
+并在写入后的一小段时间内把相关用户的读取也路由到主库（读己之写）
+"""
+
+import itertools
+import threading
+import time
+from typing import Dict, Hashable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+# 语句上的执行选项：标记该查询可以读从库
+REPLICA_OPTION = "use_replica"
+
+REPLICA_STRATEGIES = ("round_robin", "least_busy")
+
+
+class ReplicaRouter:
+    """
+    从库路由器
+    负责选择从库，并记录最近写入过的键
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], strategy: str = "round_robin",
+                 read_your_writes_seconds: float = 5.0):
+        """
+        初始化路由器
+
+        Args:
+            primary: 主库同步引擎
+            replicas: 从库同步引擎列表，为空时所有查询都走主库
+            strategy: 从库选择策略，"round_robin"（轮询）或"least_busy"（当前借出连接最少）
+            read_your_writes_seconds: 写入后多长时间内（秒）相关读取走主库，应不小于从库复制延迟
+        """
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"不支持的从库选择策略: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        # 最近写入的键 -> 截止时间（time.monotonic）
+        self._recent_writes: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def pick_replica(self) -> Engine:
+        """
+        选择一个从库
+
+        Returns:
+            Engine: 从库同步引擎
+        """
+        if self.strategy == "least_busy":
+            return min(self.replicas, key=lambda engine: engine.pool.checkedout())
+        with self._lock:
+            return self.replicas[next(self._cycle)]
+
+    def mark_written(self, *keys: Hashable):
+        """
+        记录刚写入的键（例如 ("username", "alice")），在读己之写窗口内读取这些键时走主库
+        只对本进程有效，其他工作进程依靠从库未命中时回查主库兜底
+
+        Args:
+            keys: 写入的键
+        """
+        if not self.replicas or self.read_your_writes_seconds <= 0:
+            return
+        now = time.monotonic()
+        deadline = now + self.read_your_writes_seconds
+        with self._lock:
+            # 顺带清理已过期的记录，避免字典无限增长
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {key: until for key, until in self._recent_writes.items() if until > now}
+            for key in keys:
+                self._recent_writes[key] = deadline
+
+    def recently_written(self, key: Hashable) -> bool:
+        """
+        判断某个键是否处在读己之写窗口内
+
+        Args:
+            key: 键
+
+        Returns:
+            bool: 是否需要读主库
+        """
+        deadline = self._recent_writes.get(key)
+        return deadline is not None and deadline > time.monotonic()
+
+    def get_stats(self) -> Dict[str, object]:
+        """
+        获取路由统计信息
+
+        Returns:
+            Dict[str, object]: 从库数量、策略、主库/从库读取次数和各从库借出的连接数
+        """
+        return {
+            "replicas": len(self.replicas),
+            "strategy": self.strategy,
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replica_checked_out": [engine.pool.checkedout() for engine in self.replicas],
+        }
+
+
+class RoutingSession(Session):
+    """
+    支持读写分离的会话
+    只有带 use_replica 执行选项的SELECT才会读从库；事务中一旦写过数据，
+    该事务之后的读取都走主库，保证同一事务内能读到自己的修改
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        router: Optional[ReplicaRouter] = self.info.get("router")
+        if router is None or not router.replicas:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        if (
+            isinstance(clause, Select)
+            and not self._flushing
+            and not self.info.get("force_primary")
+            and clause.get_execution_options().get(REPLICA_OPTION)
+        ):
+            router.replica_reads += 1
+            return router.pick_replica()
+
+        if not isinstance(clause, Select) or self._flushing:
+            self.info["force_primary"] = True
+        else:
+            router.primary_reads += 1
+        return router.primary
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_force_primary(session: Session, transaction):
+    """
+    最外层事务提交或回滚后恢复读从库：写入已经提交（或已撤销），
+    同一会话中后续的新事务可以再次读从库，提交后需要读己之写的键由 mark_written 记录
+    """
+    if transaction.parent is None:
+        session.info.pop("force_primary", None)
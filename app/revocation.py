@@ -0,0 +1,281 @@
+"""
+令牌吊销列表
+按jti吊销访问令牌。数据库表是唯一的持久化存储，内存中维护一个布隆过滤器和一个精确集合：
+绝大多数未吊销的令牌在布隆过滤器处直接放行，不产生任何I/O；
+只有布隆过滤器命中时才查精确集合。内存数据从表中增量同步，过期条目自动清理
+"""
+
+import asyncio
+import calendar
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import logging
+
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import RevokedToken
+from app.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# 增量同步时回看的ID数量：并发事务的自增ID可能乱序提交，回看一小段避免漏掉记录
+SYNC_ID_OVERLAP = 100
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+    判断“一定不存在”或“可能存在”，不支持删除，需要时整体重建
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预计容纳的元素数
+            error_rate: 期望的误判率
+        """
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """
+        计算元素对应的比特位置（双重哈希）
+        """
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        """
+        添加元素
+
+        Args:
+            item: 元素
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    令牌吊销列表
+    """
+
+    def __init__(self, bloom_capacity: int = 100000, bloom_error_rate: float = 0.001):
+        """
+        初始化吊销列表
+
+        Args:
+            bloom_capacity: 布隆过滤器初始容量，实际数量超过后自动扩容重建
+            bloom_error_rate: 布隆过滤器误判率
+        """
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        # 精确集合：jti -> 令牌过期时间（Unix时间戳）
+        self._exact: Dict[str, float] = {}
+        # 已同步到的最大表ID，用于增量同步
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.bloom_hits = 0
+        self.bloom_false_positives = 0
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        检查令牌是否已被吊销
+
+        Args:
+            jti: 令牌ID
+
+        Returns:
+            bool: 是否已吊销
+        """
+        if jti not in self._bloom:
+            return False
+
+        self.bloom_hits += 1
+        expires_at = self._exact.get(jti)
+        if expires_at is None:
+            self.bloom_false_positives += 1
+            return False
+        return True
+
+    def add(self, jti: str, expires_at: float):
+        """
+        把吊销记录加入内存（不写数据库）
+
+        Args:
+            jti: 令牌ID
+            expires_at: 令牌过期时间（Unix时间戳）
+        """
+        with self._lock:
+            if jti in self._exact:
+                return
+            self._exact[jti] = expires_at
+            if self._bloom.count >= self._bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self._bloom.add(jti)
+
+    def _rebuild_bloom(self):
+        """
+        用精确集合重建布隆过滤器，容量至少为当前数量的两倍
+        调用方需持有锁
+        """
+        bloom = BloomFilter(max(self.bloom_capacity, len(self._exact) * 2), self.bloom_error_rate)
+        for jti in self._exact:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    async def revoke(self, db: AsyncSession, jti: str, expires_at: datetime):
+        """
+        吊销令牌：写入数据库并立即加入本进程的内存集合
+        同一台机器上的其他工作进程通过失效广播立即得到这条记录，其余的在下一次增量同步时得到
+
+        Args:
+            db: 数据库会话
+            jti: 令牌ID
+            expires_at: 令牌过期时间（UTC）
+        """
+        try:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+            await db.commit()
+        except IntegrityError:
+            # 同一个令牌重复吊销，忽略
+            await db.rollback()
+        expires_ts = _timestamp(expires_at)
+        self.add(jti, expires_ts)
+        invalidation_bus.publish("revoke", jti=jti, exp=expires_ts)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """
+        从数据库增量同步新的吊销记录
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            int: 本次读取的记录数
+        """
+        query = (
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._last_id - SYNC_ID_OVERLAP)
+            .order_by(RevokedToken.id)
+        )
+        rows = (await db.execute(query)).all()
+        now = time.time()
+        for row_id, jti, expires_at in rows:
+            expires_ts = _timestamp(expires_at)
+            if expires_ts > now:
+                self.add(jti, expires_ts)
+            self._last_id = max(self._last_id, row_id)
+        return len(rows)
+
+    async def prune(self, db: AsyncSession) -> int:
+        """
+        清理已过期的吊销记录（令牌本身已过期，不再需要吊销）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            int: 从内存中清理的记录数
+        """
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, expires_at in self._exact.items() if expires_at <= now]
+            for jti in expired:
+                del self._exact[jti]
+            if expired:
+                self._rebuild_bloom()
+        return len(expired)
+
+    async def _run(self, db_manager, sync_interval: float, prune_interval: float):
+        """
+        后台同步循环
+        """
+        last_prune = 0.0
+        while True:
+            try:
+                async for db in db_manager.get_session():
+                    await self.sync(db)
+                    if time.monotonic() - last_prune >= prune_interval:
+                        pruned = await self.prune(db)
+                        last_prune = time.monotonic()
+                        if pruned:
+                            logger.info(f"已清理 {pruned} 条过期的令牌吊销记录")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"同步令牌吊销列表失败: {e}")
+            await asyncio.sleep(sync_interval)
+
+    def start(self, db_manager, sync_interval: float = 5.0, prune_interval: float = 300.0):
+        """
+        启动后台同步任务
+        在应用启动时调用
+
+        Args:
+            db_manager: 数据库管理器
+            sync_interval: 增量同步间隔（秒）
+            prune_interval: 过期清理间隔（秒）
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db_manager, sync_interval, prune_interval))
+
+    async def stop(self):
+        """
+        停止后台同步任务
+        在应用关闭时调用
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取吊销列表统计信息
+
+        Returns:
+            Dict[str, float]: 吊销数量、布隆过滤器命中和误判次数
+        """
+        return {
+            "revoked": len(self._exact),
+            "bloom_capacity": self._bloom.capacity,
+            "bloom_hits": self.bloom_hits,
+            "bloom_false_positives": self.bloom_false_positives,
+        }
+
+
+def _timestamp(value: datetime) -> float:
+    """
+    把数据库中的UTC时间转换为Unix时间戳
+    """
+    return calendar.timegm(value.utctimetuple())
@@ -3,11 +3,71 @@
 定义API请求和响应的数据结构，使用Pydantic进行数据验证
 """
 
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
+from pydantic import BaseModel, EmailStr, PrivateAttr, validator
+from typing import Dict, Optional
 from datetime import datetime
 
 
+def normalize_username(username: str) -> str:
+    """
+    规范化用户名：去掉首尾空白并转为小写
+    用户名按规范化后的值唯一并用于登录查询，Alice 和 alice 是同一个用户
+    
+    Args:
+        username: 用户名
+        
+    Returns:
+        str: 规范化后的用户名
+    """
+    return username.strip().lower()
+
+
+def normalize_email(email: str) -> str:
+    """
+    规范化邮箱：去掉首尾空白并转为小写，用于邮箱前缀搜索
+    
+    Args:
+        email: 邮箱地址
+        
+    Returns:
+        str: 规范化后的邮箱
+    """
+    return email.strip().lower()
+
+
+def reverse_email_domain(email: str) -> str:
+    """
+    把邮箱转换为“反转域名@本地部分”的形式，如 alice@mail.example.com -> com.example.mail@alice
+    同一域名（及其子域名）的用户在索引中相邻，按域名查找用户是一次前缀范围扫描
+    
+    Args:
+        email: 邮箱地址
+        
+    Returns:
+        str: 反转域名形式的规范化邮箱
+    """
+    local, _, domain = normalize_email(email).rpartition("@")
+    return ".".join(reversed(domain.split("."))) + "@" + local
+
+
+def identity_columns(username: str, email: str) -> Dict[str, str]:
+    """
+    计算用户表中保存的规范化身份列，写入用户时与用户名、邮箱一起插入
+    
+    Args:
+        username: 用户名
+        email: 邮箱地址
+        
+    Returns:
+        Dict[str, str]: username_normalized、email_normalized、email_domain_reversed
+    """
+    return {
+        "username_normalized": normalize_username(username),
+        "email_normalized": normalize_email(email),
+        "email_domain_reversed": reverse_email_domain(email),
+    }
+
+
 class UserBase(BaseModel):
     """
     用户基础模型
@@ -32,7 +92,30 @@ class UserBase(BaseModel):
         return v
 
 
-class UserCreate(UserBase):
+class UserIdentity(UserBase):
+    """
+    待写入数据库的用户身份
+    验证通过后计算一次规范化身份列，创建用户和批量导入直接使用，不再各自规范化
+    """
+    _identity: Dict[str, str] = PrivateAttr(default_factory=dict)
+    
+    def model_post_init(self, __context) -> None:
+        """
+        字段验证完成后计算规范化身份列
+        """
+        self._identity = identity_columns(self.username, self.email)
+    
+    def identity_columns(self) -> Dict[str, str]:
+        """
+        规范化身份列（用户名和邮箱保留原始大小写用于显示）
+        
+        Returns:
+            Dict[str, str]: 见 identity_columns
+        """
+        return dict(self._identity)
+
+
+class UserCreate(UserIdentity):
     """
     用户创建模型
     用于用户注册时的数据验证
@@ -62,9 +145,17 @@ class UserLogin(BaseModel):
     """
     用户登录模型
     用于用户登录时的数据验证
+    用户名在验证时规范化，之后的查询、限流计数都使用规范化后的用户名，不区分大小写
     """
     username: str
     password: str
+    
+    @validator('username')
+    def normalize_login_username(cls, v):
+        """
+        规范化用户名
+        """
+        return normalize_username(v)
 
 
 class UserResponse(UserBase):
@@ -80,6 +171,27 @@ class UserResponse(UserBase):
     class Config:
         # 允许从ORM模型创建Pydantic模型
         from_attributes = True
+    
+    @classmethod
+    def from_record(cls, record) -> "UserResponse":
+        """
+        用 UserRecord 构建用户响应
+        记录来自数据库或用户查询缓存，写入时已经校验过，直接按字段构建，不再逐个属性读取和校验
+        
+        Args:
+            record: 用户记录（app.records.UserRecord）
+            
+        Returns:
+            UserResponse: 用户响应
+        """
+        return cls.model_construct(
+            id=record.id,
+            username=record.username,
+            email=record.email,
+            is_active=record.is_active,
+            created_at=record.created_at,
+            last_login=record.last_login,
+        )
 
 
 class UserInDB(UserResponse):
@@ -99,12 +211,46 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class RefreshTokenRequest(BaseModel):
+    """
+    刷新令牌请求模型
+    用于使用刷新令牌换取新的访问令牌
+    """
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     """
     令牌数据模型
     用于解析JWT令牌中的用户信息
+    登录时签发的令牌还带有用户资料声明，/auth/me 可以直接使用而无需查询数据库
     """
     username: Optional[str] = None
+    jti: Optional[str] = None
+    expires_at: Optional[datetime] = None
+    user_id: Optional[int] = None
+    email: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    last_login: Optional[datetime] = None
+    
+    def to_user_response(self) -> Optional["UserResponse"]:
+        """
+        用令牌中的资料声明构建用户响应
+        
+        Returns:
+            Optional[UserResponse]: 声明完整时返回用户信息，否则返回None
+        """
+        if self.user_id is None or self.email is None or self.is_active is None or self.created_at is None:
+            return None
+        return UserResponse(
+            id=self.user_id,
+            username=self.username,
+            email=self.email,
+            is_active=self.is_active,
+            created_at=self.created_at,
+            last_login=self.last_login,
+        )
 
 
 class APIResponse(BaseModel):
@@ -4,16 +4,70 @@
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+import base64
+import calendar
+import hashlib
+import hmac
+import secrets
+import uuid
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.config import settings
-from app.schemas import TokenData
+from app.schemas import TokenData, UserResponse
+from app.hashing import PasswordHasher, build_context_options
+from app.token_cache import VerifiedTokenCache
+from app.signing import InvalidTokenError, create_signer, load_key_set
+from app.revocation import RevocationList
 
 # 创建密码加密上下文
-# 使用bcrypt算法进行密码哈希
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 哈希方案和工作因子来自配置，可以通过校准按机器调整
+pwd_context = CryptContext(**build_context_options(
+    scheme=settings.password_hash_scheme,
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism,
+))
+
+# 密码哈希工作池，哈希和校验在这里执行，不占用事件循环
+password_hasher = PasswordHasher(
+    executor_type=settings.password_hash_executor,
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+# JWT签名密钥集合和签名后端，密钥在启动时解析一次，之后每次签名/验证直接复用
+key_set = load_key_set(
+    settings.algorithm,
+    settings.secret_key,
+    private_key_file=settings.jwt_private_key_file,
+    public_key_file=settings.jwt_public_key_file,
+    keys_dir=settings.jwt_keys_dir,
+    active_kid=settings.jwt_active_kid,
+)
+token_signer = create_signer(settings.jwt_backend, key_set)
+
+# 刷新令牌摘要使用的HMAC密钥，未单独配置时使用JWT密钥
+refresh_token_key = (settings.refresh_token_secret or settings.secret_key).encode()
+
+# 令牌吊销列表，未吊销的令牌只经过一次内存中的布隆过滤器检查
+revocation_list = RevocationList(
+    bloom_capacity=settings.revocation_bloom_capacity,
+    bloom_error_rate=settings.revocation_bloom_error_rate,
+)
+
+# 已验证令牌缓存，同一令牌重复验证时跳过签名校验
+token_cache = VerifiedTokenCache(max_entries=settings.token_cache_max_entries)
+
+
+def _claim_datetime(value: Optional[int]) -> Optional[datetime]:
+    """
+    把令牌中的Unix时间戳转换为UTC时间（与数据库中的时间格式一致）
+    """
+    if value is None:
+        return None
+    return datetime.utcfromtimestamp(value)
 
 
 class SecurityManager:
@@ -49,6 +103,52 @@ class SecurityManager:
         """
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    def password_needs_update(hashed_password: str) -> bool:
+        """
+        检查密码哈希是否使用了旧的方案或参数
+        
+        Args:
+            hashed_password: 数据库中存储的加密密码
+            
+        Returns:
+            bool: 是否需要用当前参数重新加密
+        """
+        return pwd_context.needs_update(hashed_password)
+    
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """
+        在工作池中异步加密密码
+        
+        Args:
+            password: 原始密码
+            
+        Returns:
+            str: 加密后的密码哈希
+            
+        Raises:
+            HashQueueFullError: 哈希任务排队已满时抛出
+        """
+        return await password_hasher.hash(password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """
+        在工作池中异步验证密码
+        
+        Args:
+            plain_password: 用户输入的原始密码
+            hashed_password: 数据库中存储的加密密码
+            
+        Returns:
+            bool: 密码是否正确
+            
+        Raises:
+            HashQueueFullError: 哈希任务排队已满时抛出
+        """
+        return await password_hasher.verify(plain_password, hashed_password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """
@@ -71,11 +171,12 @@ class SecurityManager:
             # 使用配置中的默认过期时间
             expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
         
-        # 添加过期时间到令牌数据中
+        # 添加过期时间和令牌ID（用于吊销）到令牌数据中
         to_encode.update({"exp": expire})
+        to_encode.setdefault("jti", uuid.uuid4().hex)
         
         # 生成JWT令牌
-        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+        encoded_jwt = token_signer.encode(to_encode)
         return encoded_jwt
     
     @staticmethod
@@ -99,29 +200,135 @@ class SecurityManager:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
+        # 先查缓存，命中时无需再次校验签名
+        token_data = token_cache.get(token)
+        if token_data is None:
+            token_data = SecurityManager._decode_token(token, credentials_exception)
+        
+        # 检查令牌是否已被吊销
+        if token_data.jti and revocation_list.is_revoked(token_data.jti):
+            raise credentials_exception
+        
+        return token_data
+    
+    @staticmethod
+    def _decode_token(token: str, credentials_exception: HTTPException) -> TokenData:
+        """
+        完整验证JWT令牌的签名和有效期，并缓存结果
+        
+        Args:
+            token: JWT令牌字符串
+            credentials_exception: 令牌无效时抛出的异常
+            
+        Returns:
+            TokenData: 解析出的令牌数据
+        """
         try:
             # 解码JWT令牌
-            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            payload = token_signer.decode(token)
             
-            # 获取用户名
+            # 获取用户名和过期时间；本服务签发的令牌都带有过期时间，没有过期时间的令牌不接受
             username: str = payload.get("sub")
-            if username is None:
+            expires = payload.get("exp")
+            if username is None or expires is None:
                 raise credentials_exception
             
-            # 创建令牌数据对象
-            token_data = TokenData(username=username)
+            # 创建令牌数据对象，并缓存到令牌过期为止
+            token_data = TokenData(
+                username=username,
+                jti=payload.get("jti"),
+                expires_at=_claim_datetime(expires),
+                user_id=payload.get("uid"),
+                email=payload.get("email"),
+                is_active=payload.get("active"),
+                created_at=_claim_datetime(payload.get("created_at")),
+                last_login=_claim_datetime(payload.get("last_login")),
+            )
+            token_cache.put(token, token_data, expires)
             return token_data
             
-        except JWTError:
+        except InvalidTokenError:
             raise credentials_exception
     
     @staticmethod
-    def create_token_for_user(username: str) -> str:
+    def hash_refresh_token(refresh_token: str) -> bytes:
+        """
+        计算刷新令牌的摘要（refresh_tokens 表的主键）
+        刷新令牌本身是高熵随机串，用一次HMAC即可安全存储，无需bcrypt
+        
+        Args:
+            refresh_token: 刷新令牌
+            
+        Returns:
+            bytes: 32字节的HMAC-SHA256摘要
+        """
+        return hmac.new(refresh_token_key, refresh_token.encode(), hashlib.sha256).digest()
+    
+    @staticmethod
+    def _sign_refresh_payload(payload: str) -> str:
+        """
+        计算刷新令牌内容的签名（与摘要使用不同的前缀，二者不会相同）
+        """
+        digest = hmac.new(refresh_token_key, b"refresh:" + payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+    
+    @staticmethod
+    def generate_refresh_token(user_id: int, expires_at: datetime) -> str:
+        """
+        生成新的刷新令牌
+        令牌格式为 用户ID.过期时间戳.随机串.签名，自带用户和有效期，签发时不需要写数据库
+        
+        Args:
+            user_id: 用户ID
+            expires_at: 过期时间（UTC）
+            
+        Returns:
+            str: 返回给客户端的刷新令牌
+        """
+        payload = f"{user_id}.{calendar.timegm(expires_at.utctimetuple())}.{secrets.token_urlsafe(16)}"
+        return f"{payload}.{SecurityManager._sign_refresh_payload(payload)}"
+    
+    @staticmethod
+    def parse_refresh_token(refresh_token: str) -> Optional[Tuple[int, datetime]]:
+        """
+        校验刷新令牌的签名并取出其中的用户ID和过期时间（不检查是否过期）
+        
+        Args:
+            refresh_token: 刷新令牌
+            
+        Returns:
+            Optional[Tuple[int, datetime]]: (用户ID, 过期时间)，格式或签名不正确时返回None
+        """
+        payload, _, signature = refresh_token.rpartition(".")
+        fields = payload.split(".")
+        if len(fields) != 3 or not hmac.compare_digest(
+            signature.encode(), SecurityManager._sign_refresh_payload(payload).encode()
+        ):
+            return None
+        try:
+            return int(fields[0]), datetime.utcfromtimestamp(int(fields[1]))
+        except (ValueError, OverflowError, OSError):
+            return None
+    
+    @staticmethod
+    def get_jwks() -> dict:
+        """
+        获取用于验证令牌的公钥集合（JWKS）
+        其他服务拿到公钥后即可在本地验证令牌，无需回调本服务
+        
+        Returns:
+            dict: JWKS文档，HS256时为空集合
+        """
+        return key_set.to_jwks()
+    
+    @staticmethod
+    def create_token_for_user(username: str, profile: Optional[UserResponse] = None) -> str:
         """
         为用户创建访问令牌
         
         Args:
             username: 用户名
+            profile: 用户资料（可选），写入令牌后 /auth/me 无需查询数据库
             
         Returns:
             str: JWT令牌字符串
@@ -129,9 +336,21 @@ class SecurityManager:
         # 设置令牌过期时间
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         
+        # 令牌声明，资料中的时间统一保存为Unix时间戳
+        data = {"sub": username}
+        if profile is not None:
+            data.update({
+                "uid": profile.id,
+                "email": profile.email,
+                "active": profile.is_active,
+                "created_at": calendar.timegm(profile.created_at.utctimetuple()),
+            })
+            if profile.last_login is not None:
+                data["last_login"] = calendar.timegm(profile.last_login.utctimetuple())
+        
         # 创建令牌
         access_token = SecurityManager.create_access_token(
-            data={"sub": username}, 
+            data=data, 
             expires_delta=access_token_expires
         )
         
@@ -0,0 +1,254 @@
+"""
+共享内存计数器表
+固定大小、基于mmap文件的哈希表，同一台机器上的所有工作进程映射同一个文件，
+共享滑动窗口计数（如登录限流、失败锁定），不产生任何网络或数据库I/O。
+
+布局：文件头 + 若干槽位。每个槽位保存键的64位哈希、最后访问时间和一组时间桶
+（桶序号 + 计数），滑动窗口内的计数为仍在窗口内的各桶之和。
+槽位按组划分，键只在自己的组内线性探测；修改时对整组加文件区域锁（fcntl.lockf），
+不同组的操作互不阻塞。组满时复用窗口已过期或最久未访问的槽位
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有文件区域锁，只能在进程内共享
+    fcntl = None
+
+MAGIC = b"UCNT0001"
+# 文件头：魔数、槽位数、每组槽位数、桶数、桶宽度（秒）
+HEADER = struct.Struct("<8sIIId")
+HEADER_SIZE = 64
+# 槽位头：键哈希（0表示空槽）、最后访问时间（Unix秒）
+SLOT_HEAD = struct.Struct("<QI4x")
+# 时间桶：桶序号、计数
+BUCKET = struct.Struct("<II")
+
+
+class SharedCounterTable:
+    """
+    跨进程共享的滑动窗口计数器表
+    """
+
+    def __init__(self, path: str, window_seconds: float, buckets: int = 12,
+                 slots: int = 65536, group_size: int = 8):
+        """
+        打开（必要时创建）计数器文件
+        实际文件名在 path 的扩展名之前加上布局参数的摘要，布局相同的进程共享同一个文件
+
+        Args:
+            path: 计数器文件路径，同一台机器上的工作进程必须使用同一路径
+            window_seconds: 滑动窗口长度（秒）
+            buckets: 窗口划分的时间桶数，越多越精确
+            slots: 槽位总数，决定能同时跟踪多少个键
+            group_size: 每组槽位数（加锁和探测的单位）
+        """
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.group_size = group_size
+        self.groups = max(1, slots // group_size)
+        self.slots = self.groups * group_size
+        self.bucket_width = window_seconds / buckets
+        self.slot_size = SLOT_HEAD.size + buckets * BUCKET.size
+        self.group_bytes = self.slot_size * group_size
+        self.size = HEADER_SIZE + self.slots * self.slot_size
+        # fcntl锁只在进程之间互斥，同一进程的多个线程再用线程锁互斥
+        self._thread_lock = threading.Lock()
+        self.evictions = 0
+
+        header = HEADER.pack(MAGIC, self.slots, group_size, buckets, self.bucket_width)
+        # 文件名带上布局参数的摘要：布局不同的进程（如滚动部署期间修改了配置）各用各的文件，
+        # 不会截断其他进程正在映射的文件
+        root, ext = os.path.splitext(path)
+        self.path = f"{root}-{hashlib.blake2b(header, digest_size=4).hexdigest()}{ext}"
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # 在整个文件的排他锁内检查并初始化，同时启动的进程只有一个写入文件头
+            self._lock_range(0, 0)
+            try:
+                self._init_file(header)
+                self._mm = mmap.mmap(self._fd, self.size)
+            finally:
+                self._unlock_range(0, 0)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _init_file(self, header: bytes):
+        """
+        初始化新创建的计数器文件（调用方持有整个文件的锁）
+        已初始化的文件保持不变；文件头或大小与布局不符时报错，不清空可能正被其他进程映射的文件
+
+        Raises:
+            RuntimeError: 文件已损坏或不是本布局的计数器文件
+        """
+        size = os.fstat(self._fd).st_size
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        existing = os.read(self._fd, HEADER.size)
+        if existing == header and size == self.size:
+            return
+        if size not in (0, self.size) or existing.strip(b"\0"):
+            raise RuntimeError(f"计数器文件 {self.path} 的大小或文件头与当前布局不一致，请删除该文件后重启")
+        # 新文件（或上次初始化在写入文件头之前中断）：扩展到完整大小后写入文件头
+        os.ftruncate(self._fd, self.size)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, header)
+
+    def _lock_range(self, start: int, length: int):
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+
+    def _unlock_range(self, start: int, length: int):
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        """
+        计算键的64位哈希，0保留表示空槽
+        """
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return value or 1
+
+    def _bucket_index(self, now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) // self.bucket_width)
+
+    def _window_total(self, offset: int, current: int) -> int:
+        """
+        计算槽位在滑动窗口内的计数之和
+        """
+        total = 0
+        base = offset + SLOT_HEAD.size
+        for i in range(self.buckets):
+            index, count = BUCKET.unpack_from(self._mm, base + i * BUCKET.size)
+            if current - self.buckets < index <= current:
+                total += count
+        return total
+
+    def _update(self, key: str, amount: int, now: Optional[float], reset: bool = False) -> int:
+        """
+        在组锁内查找（必要时分配）槽位并累加计数
+
+        Args:
+            key: 计数键
+            amount: 增加的数量，0表示只读取
+            now: 当前时间（Unix秒），不填时取系统时间
+            reset: 是否清空该键
+
+        Returns:
+            int: 操作后滑动窗口内的计数
+        """
+        key_hash = self._hash(key)
+        group = key_hash % self.groups
+        group_start = HEADER_SIZE + group * self.group_bytes
+        current = self._bucket_index(now)
+        now_seconds = int(current * self.bucket_width)
+
+        with self._thread_lock:
+            self._lock_range(group_start, self.group_bytes)
+            try:
+                slot = None
+                reusable = None
+                reusable_rank = None
+                # 从哈希决定的位置开始在组内线性探测
+                first = (key_hash // self.groups) % self.group_size
+                for step in range(self.group_size):
+                    offset = group_start + ((first + step) % self.group_size) * self.slot_size
+                    slot_hash, touched = SLOT_HEAD.unpack_from(self._mm, offset)
+                    if slot_hash == key_hash:
+                        slot = offset
+                        break
+                    # 可复用的槽位：空槽或窗口已过期的槽优先（记为-1），否则取最久未访问的
+                    expired = slot_hash == 0 or touched + self.window_seconds <= now_seconds
+                    rank = -1 if expired else touched
+                    if reusable is None or rank < reusable_rank:
+                        reusable, reusable_rank = offset, rank
+
+                if slot is None:
+                    if amount <= 0:
+                        return 0
+                    if reusable_rank >= 0:
+                        self.evictions += 1
+                    slot = reusable
+                    self._mm[slot:slot + self.slot_size] = bytes(self.slot_size)
+                    SLOT_HEAD.pack_into(self._mm, slot, key_hash, now_seconds)
+
+                if reset:
+                    self._mm[slot:slot + self.slot_size] = bytes(self.slot_size)
+                    return 0
+
+                if amount > 0:
+                    bucket_offset = slot + SLOT_HEAD.size + (current % self.buckets) * BUCKET.size
+                    index, count = BUCKET.unpack_from(self._mm, bucket_offset)
+                    count = count + amount if index == current else amount
+                    BUCKET.pack_into(self._mm, bucket_offset, current, count)
+                    SLOT_HEAD.pack_into(self._mm, slot, key_hash, now_seconds)
+
+                return self._window_total(slot, current)
+            finally:
+                self._unlock_range(group_start, self.group_bytes)
+
+    def increment(self, key: str, amount: int = 1, now: Optional[float] = None) -> int:
+        """
+        增加计数
+
+        Args:
+            key: 计数键
+            amount: 增加的数量
+            now: 当前时间（Unix秒），不填时取系统时间
+
+        Returns:
+            int: 增加后滑动窗口内的计数
+        """
+        return self._update(key, amount, now)
+
+    def count(self, key: str, now: Optional[float] = None) -> int:
+        """
+        读取滑动窗口内的计数
+
+        Args:
+            key: 计数键
+            now: 当前时间（Unix秒），不填时取系统时间
+
+        Returns:
+            int: 滑动窗口内的计数
+        """
+        return self._update(key, 0, now)
+
+    def reset(self, key: str):
+        """
+        清空某个键的计数
+
+        Args:
+            key: 计数键
+        """
+        self._update(key, 0, None, reset=True)
+
+    def close(self):
+        """
+        解除映射并关闭文件
+        """
+        self._mm.close()
+        os.close(self._fd)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取计数器表统计信息
+
+        Returns:
+            Dict[str, float]: 槽位数、窗口长度和本进程触发的槽位淘汰次数
+        """
+        return {
+            "slots": self.slots,
+            "window_seconds": self.window_seconds,
+            "evictions": self.evictions,
+        }
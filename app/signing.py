@@ -0,0 +1,494 @@
+"""
+JWT签名引擎
+把令牌的签名和验证抽象成可替换的后端，密钥在启动时解析一次后重复使用
+支持的算法：HS256、ES256、EdDSA（Ed25519）
+非对称算法的令牌带kid头部，支持密钥轮换，公钥可以通过JWKS发布给其他服务
+"""
+
+from abc import ABC, abstractmethod
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Type
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+
+
+class InvalidTokenError(Exception):
+    """
+    令牌无效
+    签名错误、格式错误或已过期时由签名后端抛出
+    """
+    pass
+
+
+# 需要从datetime转换为Unix时间戳的时间类声明
+TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+def _b64encode(data: bytes) -> bytes:
+    """
+    Base64URL编码（去掉末尾的=）
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    """
+    Base64URL解码（自动补齐末尾的=）
+    """
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _public_jwk_members(public_key: Any) -> Dict[str, str]:
+    """
+    导出公钥的JWK必需成员（RFC 7517/7518/8037）
+
+    Args:
+        public_key: cryptography公钥对象
+
+    Returns:
+        Dict[str, str]: JWK必需成员
+    """
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        numbers = public_key.public_numbers()
+        return {
+            "crv": "P-256",
+            "kty": "EC",
+            "x": _b64encode(numbers.x.to_bytes(32, "big")).decode(),
+            "y": _b64encode(numbers.y.to_bytes(32, "big")).decode(),
+        }
+    raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return {"crv": "Ed25519", "kty": "OKP", "x": _b64encode(raw).decode()}
+
+
+def key_thumbprint(public_key: Any) -> str:
+    """
+    计算公钥的JWK指纹（RFC 7638），未指定kid时用作密钥ID
+
+    Args:
+        public_key: cryptography公钥对象
+
+    Returns:
+        str: Base64URL编码的SHA-256指纹
+    """
+    canonical = json.dumps(_public_jwk_members(public_key), sort_keys=True, separators=(",", ":"))
+    return _b64encode(hashlib.sha256(canonical.encode()).digest()).decode()
+
+
+class KeySet:
+    """
+    签名密钥集合
+    包含当前用于签名的密钥（带kid）和所有可用于验证的公钥，
+    轮换密钥时新旧公钥同时存在，旧令牌在过期前仍可验证
+    """
+
+    def __init__(self, algorithm: str, signing_key: Any, active_kid: Optional[str],
+                 verify_keys: Dict[Optional[str], Any]):
+        """
+        初始化密钥集合
+
+        Args:
+            algorithm: 签名算法
+            signing_key: 当前签名密钥
+            active_kid: 当前签名密钥的ID，HS256为None
+            verify_keys: 密钥ID到验证密钥的映射
+        """
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.active_kid = active_kid
+        self.verify_keys = verify_keys
+
+    def verify_key_for(self, kid: Optional[str]) -> Any:
+        """
+        根据令牌头部的kid选择验证密钥
+        没有kid的令牌（轮换功能上线前签发）使用当前密钥验证
+
+        Args:
+            kid: 令牌头部中的密钥ID
+
+        Returns:
+            Any: 验证密钥
+
+        Raises:
+            InvalidTokenError: 密钥ID未知时抛出
+        """
+        if kid is None:
+            kid = self.active_kid
+        key = self.verify_keys.get(kid)
+        if key is None:
+            raise InvalidTokenError("未知的密钥ID")
+        return key
+
+    def to_jwks(self) -> Dict[str, Any]:
+        """
+        导出公钥集合（JWKS）
+        HS256是共享密钥，不能公开，返回空集合
+
+        Returns:
+            Dict[str, Any]: JWKS文档
+        """
+        keys = []
+        if self.algorithm != "HS256":
+            for kid, public_key in sorted(self.verify_keys.items()):
+                jwk = _public_jwk_members(public_key)
+                jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+                keys.append(jwk)
+        return {"keys": keys}
+
+
+def _check_curve(key: Any, path: str):
+    """
+    ES256只能使用P-256曲线（JWK导出和签名长度都按P-256处理）
+    """
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and key.curve.name != "secp256r1":
+        raise ValueError(f"密钥 {path} 使用的曲线 {key.curve.name} 不是ES256要求的P-256（secp256r1）")
+
+
+def _load_private_key(path: str, algorithm: str) -> Any:
+    """
+    从PEM文件加载私钥并检查类型与算法是否匹配
+    """
+    with open(path, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+    expected = ec.EllipticCurvePrivateKey if algorithm == "ES256" else ed25519.Ed25519PrivateKey
+    if not isinstance(private_key, expected):
+        raise ValueError(f"私钥 {path} 的类型与签名算法 {algorithm} 不匹配")
+    _check_curve(private_key, path)
+    return private_key
+
+
+def _load_public_key(path: str, algorithm: str) -> Any:
+    """
+    从PEM文件加载公钥并检查类型与算法是否匹配
+    """
+    with open(path, "rb") as f:
+        public_key = serialization.load_pem_public_key(f.read())
+    expected = ec.EllipticCurvePublicKey if algorithm == "ES256" else ed25519.Ed25519PublicKey
+    if not isinstance(public_key, expected):
+        raise ValueError(f"公钥 {path} 的类型与签名算法 {algorithm} 不匹配")
+    _check_curve(public_key, path)
+    return public_key
+
+
+def load_key_set(algorithm: str, secret_key: str, private_key_file: str = "",
+                 public_key_file: str = "", keys_dir: str = "", active_kid: str = "") -> KeySet:
+    """
+    解析签名密钥集合
+    HS256使用共享密钥；ES256和EdDSA支持两种配置方式：
+    1. 单个私钥文件（公钥不填时从私钥推导），kid取公钥指纹
+    2. 密钥目录：<kid>.pem 为私钥，<kid>.pub.pem 为只用于验证的已退役公钥，
+       active_kid 指定签名用的密钥，不填时取文件名排序最后的私钥
+
+    Args:
+        algorithm: 签名算法
+        secret_key: HS256使用的共享密钥
+        private_key_file: PEM格式私钥文件路径
+        public_key_file: PEM格式公钥文件路径（可选）
+        keys_dir: 密钥目录（可选，优先于单个私钥文件）
+        active_kid: 当前签名密钥ID（可选）
+
+    Returns:
+        KeySet: 密钥集合
+    """
+    if algorithm == "HS256":
+        key = secret_key.encode()
+        return KeySet(algorithm, key, None, {None: key})
+
+    if algorithm not in ("ES256", "EdDSA"):
+        raise ValueError(f"不支持的签名算法: {algorithm}")
+
+    if keys_dir:
+        private_keys = {}
+        verify_keys = {}
+        for name in sorted(os.listdir(keys_dir)):
+            path = os.path.join(keys_dir, name)
+            if name.endswith(".pub.pem"):
+                kid = name[:-len(".pub.pem")]
+                public_key = _load_public_key(path, algorithm)
+            elif name.endswith(".pem"):
+                kid = name[:-len(".pem")]
+                private_keys[kid] = _load_private_key(path, algorithm)
+                public_key = private_keys[kid].public_key()
+            else:
+                continue
+            if kid in verify_keys:
+                raise ValueError(f"密钥目录 {keys_dir} 中的 {kid}.pem 和 {kid}.pub.pem 冲突，同一个kid只能有一个密钥文件")
+            verify_keys[kid] = public_key
+
+        if not private_keys:
+            raise ValueError(f"密钥目录 {keys_dir} 中没有私钥")
+        active_kid = active_kid or list(private_keys)[-1]
+        if active_kid not in private_keys:
+            raise ValueError(f"密钥目录中没有ID为 {active_kid} 的私钥")
+        return KeySet(algorithm, private_keys[active_kid], active_kid, verify_keys)
+
+    if not private_key_file:
+        raise ValueError(f"{algorithm} 需要配置私钥文件或密钥目录")
+
+    private_key = _load_private_key(private_key_file, algorithm)
+    if public_key_file:
+        public_key = _load_public_key(public_key_file, algorithm)
+    else:
+        public_key = private_key.public_key()
+    kid = active_kid or key_thumbprint(public_key)
+    return KeySet(algorithm, private_key, kid, {kid: public_key})
+
+
+class TokenSigner(ABC):
+    """
+    签名后端基类
+    子类实现具体的编码和解码，密钥对象在构造时准备好
+    """
+
+    backend = ""
+    algorithms: Tuple[str, ...] = ()
+
+    def __init__(self, key_set: KeySet):
+        """
+        初始化签名后端
+
+        Args:
+            key_set: 签名密钥集合
+        """
+        if key_set.algorithm not in self.algorithms:
+            raise ValueError(f"签名后端 {self.backend} 不支持算法 {key_set.algorithm}")
+        self.algorithm = key_set.algorithm
+        self.key_set = key_set
+        # 签发令牌时写入头部的kid
+        self.headers = {"kid": key_set.active_kid} if key_set.active_kid else None
+
+    @staticmethod
+    def _prepare_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把时间类声明中的datetime（UTC）转换为Unix时间戳
+        """
+        prepared = dict(claims)
+        for name in TIME_CLAIMS:
+            value = prepared.get(name)
+            if isinstance(value, datetime):
+                prepared[name] = calendar.timegm(value.utctimetuple())
+        return prepared
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """
+        签名并生成令牌
+
+        Args:
+            claims: 令牌声明
+
+        Returns:
+            str: JWT令牌字符串
+        """
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        验证令牌签名和有效期并返回声明
+
+        Args:
+            token: JWT令牌字符串
+
+        Returns:
+            Dict[str, Any]: 令牌声明
+
+        Raises:
+            InvalidTokenError: 令牌无效或已过期时抛出
+        """
+
+
+class JoseSigner(TokenSigner):
+    """
+    python-jose后端
+    与原有实现兼容，但密钥在构造时转换为jose的Key对象，避免每次调用都重新解析
+    """
+
+    backend = "jose"
+    algorithms = ("HS256", "ES256")
+
+    def __init__(self, key_set: KeySet):
+        super().__init__(key_set)
+        from jose import jwk
+
+        if self.algorithm == "HS256":
+            self._signing_key = jwk.construct(key_set.signing_key, self.algorithm)
+            self._verify_keys = {None: self._signing_key}
+        else:
+            self._signing_key = jwk.construct(key_set.signing_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ), self.algorithm)
+            self._verify_keys = {
+                kid: jwk.construct(public_key.public_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PublicFormat.SubjectPublicKeyInfo,
+                ), self.algorithm)
+                for kid, public_key in key_set.verify_keys.items()
+            }
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        from jose import jwt
+        return jwt.encode(self._prepare_claims(claims), self._signing_key,
+                          algorithm=self.algorithm, headers=self.headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        from jose import JWTError, jwt
+        try:
+            kid = jwt.get_unverified_header(token).get("kid") or self.key_set.active_kid
+            key = self._verify_keys.get(kid)
+            if key is None:
+                raise InvalidTokenError("未知的密钥ID")
+            return jwt.decode(token, key, algorithms=[self.algorithm])
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class PyJWTSigner(TokenSigner):
+    """
+    PyJWT后端（依赖requirements.txt中的pyjwt）
+    直接使用cryptography密钥对象，支持EdDSA
+    """
+
+    backend = "pyjwt"
+    algorithms = ("HS256", "ES256", "EdDSA")
+
+    def __init__(self, key_set: KeySet):
+        super().__init__(key_set)
+        try:
+            import jwt
+        except ImportError as e:
+            raise ValueError("使用pyjwt签名后端需要先安装pyjwt（pip install -r requirements.txt）") from e
+        self._jwt = jwt
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return self._jwt.encode(self._prepare_claims(claims), self.key_set.signing_key,
+                                algorithm=self.algorithm, headers=self.headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            kid = self._jwt.get_unverified_header(token).get("kid")
+            key = self.key_set.verify_key_for(kid)
+            return self._jwt.decode(token, key, algorithms=[self.algorithm])
+        except self._jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class NativeSigner(TokenSigner):
+    """
+    原生后端
+    直接用hmac和cryptography实现JWS Compact序列化，头部在构造时预先编码，
+    每次调用只做一次JSON序列化和一次签名运算
+    """
+
+    backend = "native"
+    algorithms = ("HS256", "ES256", "EdDSA")
+
+    def __init__(self, key_set: KeySet):
+        super().__init__(key_set)
+        header = {"alg": self.algorithm, "typ": "JWT"}
+        if self.headers:
+            header.update(self.headers)
+        self._header = _b64encode(json.dumps(header, separators=(",", ":")).encode())
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        """
+        计算签名，ES256签名转换为JWS要求的 r||s 定长格式
+        """
+        signing_key = self.key_set.signing_key
+        if self.algorithm == "HS256":
+            return hmac.new(signing_key, signing_input, hashlib.sha256).digest()
+        if self.algorithm == "ES256":
+            r, s = decode_dss_signature(signing_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return signing_key.sign(signing_input)
+
+    def _verify(self, verify_key: Any, signing_input: bytes, signature: bytes) -> bool:
+        """
+        校验签名
+        """
+        if self.algorithm == "HS256":
+            expected = hmac.new(verify_key, signing_input, hashlib.sha256).digest()
+            return hmac.compare_digest(expected, signature)
+        try:
+            if self.algorithm == "ES256":
+                if len(signature) != 64:
+                    return False
+                der = encode_dss_signature(
+                    int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+                )
+                verify_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+            else:
+                verify_key.verify(signature, signing_input)
+            return True
+        except InvalidSignature:
+            return False
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        payload = _b64encode(json.dumps(self._prepare_claims(claims), separators=(",", ":")).encode())
+        signing_input = self._header + b"." + payload
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, _, signature = token.encode().rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            header = json.loads(_b64decode(header_segment))
+            if header.get("alg") != self.algorithm:
+                raise InvalidTokenError("签名算法不匹配")
+            verify_key = self.key_set.verify_key_for(header.get("kid"))
+            if not self._verify(verify_key, signing_input, _b64decode(signature)):
+                raise InvalidTokenError("签名验证失败")
+            claims = json.loads(_b64decode(payload_segment))
+        except InvalidTokenError:
+            raise
+        except Exception as e:
+            raise InvalidTokenError(f"令牌格式错误: {e}") from e
+
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("令牌声明格式错误")
+        try:
+            expires = float(claims["exp"]) if "exp" in claims else None
+            not_before = float(claims["nbf"]) if "nbf" in claims else None
+        except (TypeError, ValueError) as e:
+            raise InvalidTokenError(f"令牌时间声明格式错误: {e}") from e
+        now = time.time()
+        if expires is not None and expires <= now:
+            raise InvalidTokenError("令牌已过期")
+        if not_before is not None and not_before > now:
+            raise InvalidTokenError("令牌尚未生效")
+        return claims
+
+
+# 可用的签名后端
+SIGNER_BACKENDS: Dict[str, Type[TokenSigner]] = {
+    JoseSigner.backend: JoseSigner,
+    PyJWTSigner.backend: PyJWTSigner,
+    NativeSigner.backend: NativeSigner,
+}
+
+
+def create_signer(backend: str, key_set: KeySet) -> TokenSigner:
+    """
+    创建签名后端实例
+
+    Args:
+        backend: 后端名称（jose、pyjwt、native）
+        key_set: 签名密钥集合
+
+    Returns:
+        TokenSigner: 签名后端实例
+    """
+    signer_class: Optional[Type[TokenSigner]] = SIGNER_BACKENDS.get(backend)
+    if signer_class is None:
+        raise ValueError(f"未知的签名后端: {backend}")
+    return signer_class(key_set)
@@ -0,0 +1,125 @@
+"""
+已验证令牌缓存
+缓存JWT解码结果，同一个令牌重复验证时只需一次字典查询
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.schemas import TokenData
+
+
+class VerifiedTokenCache:
+    """
+    有容量上限的LRU令牌缓存
+    以令牌的SHA-256摘要为键（不在内存中保存原始令牌），
+    缓存项在令牌的exp时间到达后失效
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        初始化令牌缓存
+
+        Args:
+            max_entries: 最多缓存的令牌数，0表示禁用缓存
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[TokenData, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        """
+        计算令牌摘要
+
+        Args:
+            token: JWT令牌字符串
+
+        Returns:
+            bytes: 令牌的SHA-256摘要
+        """
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        """
+        查询已验证的令牌
+
+        Args:
+            token: JWT令牌字符串
+
+        Returns:
+            Optional[TokenData]: 缓存的令牌数据，未命中或已过期时返回None
+        """
+        if not self.max_entries:
+            return None
+
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            token_data, expires_at = entry
+            if expires_at <= time.time():
+                # 令牌已过期，移除后按未命中处理，由调用方走完整验证并报错
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token_data
+
+    def put(self, token: str, token_data: TokenData, expires_at: float):
+        """
+        缓存验证通过的令牌
+
+        Args:
+            token: JWT令牌字符串
+            token_data: 解析出的令牌数据
+            expires_at: 令牌过期时间（Unix时间戳，即exp声明）
+        """
+        if not self.max_entries:
+            return
+
+        key = self._digest(token)
+        with self._lock:
+            self._entries[key] = (token_data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, float]: 命中/未命中次数、命中率和当前大小
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,251 @@
+"""
+用户查询缓存
+缓存 UserCRUD 按用户名、邮箱、ID查询到的用户，热点账户重复查询时不再访问数据库。
+缓存值是 UserRecord（内存后端直接保存记录，Redis等序列化后端保存按列顺序排列、不含密码哈希的列表），
+同一用户在三个键下各存一份，任何写操作都通过 invalidate 删除全部三个键；
+只有批量写回的最后登录时间直接更新缓存中的记录
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.cache import CACHE_BACKENDS, CacheBackend
+from app.config import settings
+from app.database import User
+from app.records import UserRecord
+from app.schemas import identity_columns, normalize_email, normalize_username
+
+# 缓存的列（规范化身份列由用户名和邮箱计算）
+CACHED_COLUMNS = UserRecord._fields
+# 序列化保存时，datetime列以ISO格式字符串保存
+DATETIME_COLUMNS = ("created_at", "last_login")
+DATETIME_INDEXES = tuple(CACHED_COLUMNS.index(column) for column in DATETIME_COLUMNS)
+# 序列化后端（如Redis）可以被网络上的其他服务访问，不保存密码哈希
+PASSWORD_HASH_INDEX = CACHED_COLUMNS.index("hashed_password")
+
+
+# 用户名和邮箱键使用规范化后的值，不同大小写的查询命中同一条缓存
+KEY_NORMALIZERS = {"username": normalize_username, "email": normalize_email}
+
+
+def _cache_key(field: str, value: Any) -> str:
+    """
+    构建缓存键，例如 username:alice
+    """
+    if field in KEY_NORMALIZERS:
+        value = KEY_NORMALIZERS[field](value)
+    return f"{field}:{value}"
+
+
+def _to_record(user: Union[User, UserRecord]) -> UserRecord:
+    """
+    把用户对象转换为用户记录（已经是用户记录时原样返回）
+    """
+    if isinstance(user, UserRecord):
+        return user
+    return UserRecord._make(getattr(user, column) for column in CACHED_COLUMNS)
+
+
+def _serialize(record: UserRecord) -> List[Any]:
+    """
+    把用户记录转换为按列顺序排列的列表（可JSON序列化，不含密码哈希）
+    """
+    values = list(record)
+    values[PASSWORD_HASH_INDEX] = None
+    for index in DATETIME_INDEXES:
+        if values[index] is not None:
+            values[index] = values[index].isoformat()
+    return values
+
+
+def _deserialize(values: Any) -> Optional[UserRecord]:
+    """
+    把缓存值还原为用户记录，格式不符（如旧版本写入的字典）时返回None
+    """
+    if isinstance(values, UserRecord):
+        return values
+    if not isinstance(values, list) or len(values) != len(CACHED_COLUMNS):
+        return None
+    for index in DATETIME_INDEXES:
+        if values[index] is not None:
+            values[index] = datetime.fromisoformat(values[index])
+    return UserRecord._make(values)
+
+
+def _to_user(record: UserRecord) -> User:
+    """
+    把用户记录还原为分离（detached）状态的用户对象
+    """
+    user = User(**record._asdict(), **identity_columns(record.username, record.email))
+    # 标记为“已持久化但未关联会话”，之后可以不经查询合并进会话
+    make_transient_to_detached(user)
+    return user
+
+
+class UserCache:
+    """
+    用户查询缓存
+    """
+
+    def __init__(self, backend: CacheBackend):
+        """
+        初始化用户缓存
+
+        Args:
+            backend: 缓存后端
+        """
+        self.backend = backend
+
+    async def lookup(self, field: str, value: Any) -> Tuple[bool, Optional[UserRecord]]:
+        """
+        从缓存读取用户记录，区分“未缓存”和“已缓存为不存在”（不需要数据库会话）
+
+        Args:
+            field: 查询字段（username、email或id）
+            value: 字段值
+
+        Returns:
+            Tuple[bool, Optional[UserRecord]]: (是否命中, 用户记录)，命中“不存在”的缓存时返回 (True, None)
+        """
+        found, cached = await self.backend.get(_cache_key(field, value))
+        if not found:
+            return False, None
+        if cached is None:
+            return True, None
+        record = _deserialize(cached)
+        return record is not None, record
+
+    async def get_user_record(self, field: str, value: Any) -> Optional[UserRecord]:
+        """
+        从缓存读取用户记录（不需要数据库会话）
+
+        Args:
+            field: 查询字段（username、email或id）
+            value: 字段值
+
+        Returns:
+            Optional[UserRecord]: 命中时返回用户记录，否则返回None
+        """
+        _, record = await self.lookup(field, value)
+        return record
+
+    async def get(self, db: AsyncSession, field: str, value: Any) -> Optional[User]:
+        """
+        从缓存读取用户，并合并进当前会话（不产生查询）
+        合并后的对象和查询得到的对象一样，修改后提交会写回数据库
+
+        Args:
+            db: 数据库会话
+            field: 查询字段（username、email或id）
+            value: 字段值
+
+        Returns:
+            Optional[User]: 命中时返回用户对象，否则返回None
+        """
+        record = await self.get_user_record(field, value)
+        if record is None or record.hashed_password is None:
+            # 不含密码哈希的记录无法还原为完整的用户对象，按未命中处理
+            return None
+        return await db.merge(_to_user(record), load=False)
+
+    async def put(self, user: Union[User, UserRecord]):
+        """
+        把用户写入缓存（用户名、邮箱、ID三个键）
+
+        Args:
+            user: 用户对象或用户记录
+        """
+        record = _to_record(user)
+        # 内存后端直接保存不可变的用户记录，三个键共用同一个对象；序列化后端保存按列顺序排列的列表
+        value = _serialize(record) if self.backend.serializes else record
+        for field in ("id", "username", "email"):
+            await self.backend.set(_cache_key(field, getattr(record, field)), value)
+
+    async def update_last_login(self, logins: Dict[int, datetime]):
+        """
+        把已缓存用户的最后登录时间更新为新值（其他列不变，保留原来的过期时间）
+        只更新已经在缓存中的用户，不缓存新的用户
+
+        Args:
+            logins: 用户ID到最后登录时间的映射
+        """
+        for user_id, login_time in logins.items():
+            record = await self.get_user_record("id", user_id)
+            if record is None or (record.last_login is not None and record.last_login >= login_time):
+                continue
+            record = record._replace(last_login=login_time)
+            value = _serialize(record) if self.backend.serializes else record
+            for field in ("id", "username", "email"):
+                await self.backend.replace(_cache_key(field, getattr(record, field)), value)
+
+    async def put_missing(self, field: str, value: Any):
+        """
+        缓存“用户不存在”，TTL内重复查询同一个不存在的用户不再访问数据库
+        创建用户时 invalidate 会删除该用户名和邮箱的缓存，包括这种记录
+
+        Args:
+            field: 查询字段（username、email或id）
+            value: 字段值
+        """
+        await self.backend.set(_cache_key(field, value), None)
+
+    async def invalidate(self, user_id: int, username: Optional[str] = None, email: Optional[str] = None):
+        """
+        删除用户的全部缓存
+        只知道用户ID时，先从缓存中找出用户名和邮箱对应的键
+
+        Args:
+            user_id: 用户ID
+            username: 用户名
+            email: 邮箱地址
+        """
+        keys = [_cache_key("id", user_id)]
+        if username is None or email is None:
+            record = await self.get_user_record("id", user_id)
+            if record is not None:
+                username = username or record.username
+                email = email or record.email
+        if username is not None:
+            keys.append(_cache_key("username", username))
+        if email is not None:
+            keys.append(_cache_key("email", email))
+        await self.backend.delete(*keys)
+
+    async def close(self):
+        """
+        释放缓存后端占用的资源
+        """
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        """
+        return self.backend.get_stats()
+
+
+def create_cache_backend(name: str) -> CacheBackend:
+    """
+    按名称创建用户缓存后端
+
+    Args:
+        name: 后端名称（memory或redis）
+
+    Returns:
+        CacheBackend: 缓存后端
+
+    Raises:
+        ValueError: 不支持的后端名称
+    """
+    if name == "memory":
+        return CACHE_BACKENDS[name](settings.user_cache_ttl_seconds, settings.user_cache_max_entries)
+    if name == "redis":
+        return CACHE_BACKENDS[name](settings.redis_url, settings.user_cache_ttl_seconds, key_prefix="user:")
+    raise ValueError(f"不支持的缓存后端: {name}")
+
+
+# 创建全局用户缓存实例
+user_cache = UserCache(create_cache_backend(settings.user_cache_backend))
@@ -0,0 +1,218 @@
+"""
+用户管理API路由
+提供管理员使用的用户列表等接口
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_token_data
+from app.config import settings
+from app.crud import SEARCH_FIELDS, user_crud
+from app.dependencies import get_db
+from app.schemas import APIResponse, TokenData, normalize_username
+
+# 创建路由器
+router = APIRouter(prefix="/users", tags=["用户管理"])
+
+# 用户列表可以返回的字段（不包含密码哈希）
+LIST_FIELDS = ("id", "username", "email", "is_active", "created_at", "last_login")
+
+
+async def require_admin(token_data: TokenData = Depends(get_current_token_data)) -> TokenData:
+    """
+    要求当前用户为管理员的依赖
+    用户名不区分大小写，令牌中的用户名和配置的管理员用户名都先规范化再比较
+
+    Args:
+        token_data: 从访问令牌中解析出的数据
+
+    Returns:
+        TokenData: 令牌数据
+
+    Raises:
+        HTTPException: 不是管理员时抛出403异常
+    """
+    admins = {normalize_username(name) for name in settings.admin_username_set}
+    if normalize_username(token_data.username) not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    return token_data
+
+
+def encode_cursor(*values) -> str:
+    """
+    把分页键编码为不透明游标
+
+    Args:
+        values: 上一页最后一行的排序键（如 created_at, id），时间会转换为ISO格式
+
+    Returns:
+        str: URL安全的游标字符串
+    """
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    解析游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+        types: 各个排序键的类型（datetime、int、str）
+
+    Returns:
+        tuple: 排序键
+
+    Raises:
+        HTTPException: 游标无效时抛出400异常
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的字段列表
+
+    Args:
+        fields: 请求的字段，不填表示全部字段
+
+    Returns:
+        List[str]: 字段名列表（保持请求顺序）
+
+    Raises:
+        HTTPException: 包含不支持的字段时抛出400异常
+    """
+    if not fields:
+        return list(LIST_FIELDS)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in LIST_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的字段: {', '.join(unknown)}，可选字段: {', '.join(LIST_FIELDS)}"
+        )
+    return names
+
+
+@router.get("/search", response_model=APIResponse, summary="搜索用户")
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索词（前缀）"),
+    field: Optional[str] = Query(
+        None,
+        description="搜索字段：username、email 或 domain（如 example.com），"
+                    "不填时以@开头按域名、包含@按邮箱、否则按用户名搜索",
+    ),
+    limit: int = Query(20, ge=1, le=100, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，不填表示第一页"),
+    _: TokenData = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    用户搜索接口（仅管理员）
+
+    按用户名、邮箱前缀或邮箱域名查找用户，结果按搜索字段排序并使用键集游标分页；
+    只支持前缀匹配，每次查询都是对应索引上的范围扫描
+
+    Args:
+        q: 搜索词
+        field: 搜索字段
+        limit: 每页条数
+        cursor: 分页游标
+        db: 数据库会话
+
+    Returns:
+        APIResponse: data 包含 items（用户列表）和 next_cursor（没有下一页时为null）
+    """
+    if field is None:
+        field = "domain" if q.startswith("@") else "email" if "@" in q else "username"
+    if field not in SEARCH_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的搜索字段: {field}，可选字段: {', '.join(SEARCH_FIELDS)}"
+        )
+    after = decode_cursor(cursor, str, int) if cursor else None
+
+    items, next_key = await user_crud.search_users(db, field, q, limit=limit, after=after)
+
+    return APIResponse.success_response(
+        message="搜索用户成功",
+        data={
+            "items": items,
+            "next_cursor": encode_cursor(*next_key) if next_key else None,
+        }
+    )
+
+
+@router.get("", response_model=APIResponse, summary="用户列表")
+async def list_users(
+    limit: int = Query(50, ge=1, le=200, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，不填表示第一页"),
+    is_active: Optional[bool] = Query(None, description="只返回活跃或禁用的用户"),
+    created_after: Optional[datetime] = Query(None, description="只返回在该时间及之后注册的用户"),
+    created_before: Optional[datetime] = Query(None, description="只返回在该时间之前注册的用户"),
+    fields: Optional[str] = Query(None, description="返回的字段（逗号分隔），不填表示全部"),
+    _: TokenData = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    用户列表接口（仅管理员）
+
+    按注册时间倒序返回用户，使用键集游标分页而不是OFFSET，翻到多深每页耗时都不变；
+    游标与过滤条件绑定，翻页时应保持相同的过滤条件
+
+    Args:
+        limit: 每页条数
+        cursor: 分页游标
+        is_active: 状态过滤
+        created_after: 注册时间下限
+        created_before: 注册时间上限
+        fields: 返回的字段
+        db: 数据库会话
+
+    Returns:
+        APIResponse: data 包含 items（用户列表）和 next_cursor（没有下一页时为null）
+    """
+    names = parse_fields(fields)
+    after = decode_cursor(cursor, datetime, int) if cursor else None
+
+    items, next_key = await user_crud.list_users_page(
+        db,
+        names,
+        limit=limit,
+        after=after,
+        is_active=is_active,
+        created_after=created_after,
+        created_before=created_before,
+    )
+
+    return APIResponse.success_response(
+        message="获取用户列表成功",
+        data={
+            "items": items,
+            "next_cursor": encode_cursor(*next_key) if next_key else None,
+        }
+    )
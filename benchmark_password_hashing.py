@@ -0,0 +1,108 @@
+"""
+密码哈希并发基准测试
+模拟大量并发登录（bcrypt校验），比较不同工作池大小下的吞吐量，
+同时测量事件循环的最大卡顿时间
+
+使用方法：python benchmark_password_hashing.py --logins 64 --executor process
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from app.hashing import PasswordHasher
+from app.security import pwd_context
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """
+    测量事件循环的最大卡顿时间
+    定时器本应每interval秒唤醒一次，实际多等待的时间就是卡顿
+
+    Returns:
+        float: 最大卡顿时间（秒）
+    """
+    max_lag = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - expected)
+    return max_lag
+
+
+async def run_blocking(logins: int, password: str, hashed: str):
+    """
+    基线：直接在事件循环中同步校验密码（原来的实现方式）
+    """
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    async def login():
+        pwd_context.verify(password, hashed)
+        await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    return elapsed, await lag_task, None
+
+
+async def run_pool(executor: str, workers: int, logins: int, password: str, hashed: str):
+    """
+    使用工作池并发校验密码
+    """
+    hasher = PasswordHasher(executor_type=executor, max_workers=workers, max_queue=0)
+    # 预热，让线程/进程先启动起来
+    await asyncio.gather(*(hasher.verify(password, hashed) for _ in range(workers)))
+    hasher.stats = type(hasher.stats)()
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(hasher.verify(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    lag = await lag_task
+    stats = hasher.get_stats()
+    hasher.shutdown()
+    return elapsed, lag, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="密码哈希并发基准测试")
+    parser.add_argument("--logins", type=int, default=64, help="并发登录次数")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread", help="执行器类型")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="最大工作数")
+    args = parser.parse_args()
+
+    password = "benchmark123"
+    hashed = pwd_context.hash(password)
+
+    print(f"并发登录数: {args.logins}，执行器: {args.executor}，CPU核心数: {os.cpu_count()}")
+    print("=" * 80)
+    print(f"{'模式':<16} {'耗时(s)':>10} {'登录/秒':>10} {'循环最大卡顿(ms)':>18} {'平均等待(ms)':>14} {'平均运行(ms)':>14}")
+    print("=" * 80)
+
+    elapsed, lag, _ = await run_blocking(args.logins, password, hashed)
+    print(f"{'事件循环内同步':<16} {elapsed:>10.2f} {args.logins / elapsed:>10.1f} {lag * 1000:>18.1f} {'-':>14} {'-':>14}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        elapsed, lag, stats = await run_pool(args.executor, workers, args.logins, password, hashed)
+        label = f"{args.executor} x {workers}"
+        print(f"{label:<16} {elapsed:>10.2f} {args.logins / elapsed:>10.1f} {lag * 1000:>18.1f} "
+              f"{stats['avg_wait_ms']:>14.1f} {stats['avg_run_ms']:>14.1f}")
+        if workers == args.max_workers:
+            break
+        workers = min(workers * 2, args.max_workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
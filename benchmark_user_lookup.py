@@ -0,0 +1,156 @@
+"""
+用户查询开销基准测试
+比较 get_user_by_*（加载完整ORM实体）与 get_user_record_by_*（预构建的列投影查询，
+结果行直接映射为 UserRecord）每次查询的耗时。测试时关闭用户查询缓存，每次都访问数据库。
+另外比较全部用户分别以ORM实体、字典（原来的缓存格式）和 UserRecord 保存时每个用户占用的内存
+
+使用方法：python benchmark_user_lookup.py [--database-url URL] [--users 10000] [--lookups 5000]
+不填 --database-url 时使用临时目录中的SQLite数据库
+"""
+
+import os
+
+# 基准测试测量的是数据库查询路径，关闭用户查询缓存（需在导入app之前设置）
+os.environ["USER_CACHE_MAX_ENTRIES"] = "0"
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from app.crud import user_crud
+from app.database import DatabaseManager, User
+from app.records import USER_RECORD_COLUMNS, UserRecord
+from app.schemas import identity_columns
+
+# 测试数据不需要真实的密码哈希
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+async def populate(db_manager: DatabaseManager, users: int):
+    """
+    创建表并补足测试用户
+    """
+    await db_manager.create_tables()
+    async for db in db_manager.get_session():
+        existing = (await db.execute(select(func.count(User.id)))).scalar_one()
+        for start in range(existing, users, 5000):
+            rows = []
+            for n in range(start, min(start + 5000, users)):
+                username, email = f"lookup_user_{n}", f"lookup_user_{n}@example.com"
+                rows.append({
+                    "username": username,
+                    "email": email,
+                    **identity_columns(username, email),
+                    "hashed_password": FAKE_HASH,
+                    "is_active": True,
+                    "created_at": datetime.utcnow(),
+                })
+            await db.execute(insert(User).values(rows))
+            await db.commit()
+
+
+async def measure(db_manager: DatabaseManager, lookup, keys) -> float:
+    """
+    依次执行查询，返回每次查询的平均耗时（微秒）
+    每次查询使用新会话，与请求处理时一致
+    """
+    started = time.perf_counter()
+    for key in keys:
+        async for db in db_manager.get_session():
+            if await lookup(db, key) is None:
+                raise RuntimeError(f"测试用户不存在: {key}")
+    return (time.perf_counter() - started) / len(keys) * 1_000_000
+
+
+async def measure_memory(db_manager: DatabaseManager, load) -> float:
+    """
+    把全部用户加载到一个列表中，返回每个用户占用的内存（字节）
+    只统计加载后仍被列表引用的对象
+    """
+    async for db in db_manager.get_session():
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            users = await load(db)
+            used = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        return used / len(users)
+
+
+async def load_orm(db) -> list:
+    return list((await db.execute(select(User))).scalars())
+
+
+async def load_dicts(db) -> list:
+    return [dict(row._mapping) for row in await db.execute(select(*USER_RECORD_COLUMNS))]
+
+
+async def load_records(db) -> list:
+    return [UserRecord._make(row) for row in await db.execute(select(*USER_RECORD_COLUMNS))]
+
+
+async def run_benchmark(args):
+    database_url = args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.gettempdir(), "user_service_lookup_bench.db"
+    )
+    db_manager = DatabaseManager(database_url)
+    try:
+        await populate(db_manager, args.users)
+
+        rng = random.Random(42)
+        numbers = [rng.randrange(args.users) for _ in range(args.lookups)]
+        cases = [
+            ("username", [f"lookup_user_{n}" for n in numbers],
+             user_crud.get_user_by_username, user_crud.get_user_record_by_username),
+            ("email", [f"lookup_user_{n}@example.com" for n in numbers],
+             user_crud.get_user_by_email, user_crud.get_user_record_by_email),
+        ]
+        async for db in db_manager.get_session():
+            ids = {row.username: row.id for row in (await db.execute(select(User.id, User.username))).all()}
+        cases.append(("id", [ids[f"lookup_user_{n}"] for n in numbers],
+                      user_crud.get_user_by_id, user_crud.get_user_record_by_id))
+
+        print(f"数据库: {database_url}")
+        print(f"{args.users} 个用户，每项 {args.lookups} 次查询（已关闭用户查询缓存）")
+        print("=" * 64)
+        print(f"{'查询方法':<18} {'ORM 微秒/次':>12} {'Core 微秒/次':>12} {'节省':>10}")
+        print("=" * 64)
+        for name, keys, orm_lookup, core_lookup in cases:
+            # 先各执行一轮预热（建立连接、编译语句）
+            await measure(db_manager, orm_lookup, keys[:100])
+            await measure(db_manager, core_lookup, keys[:100])
+            orm = await measure(db_manager, orm_lookup, keys)
+            core = await measure(db_manager, core_lookup, keys)
+            print(f"{'get_user_by_' + name:<22} {orm:>12.1f} {core:>14.1f} {(1 - core / orm) * 100:>11.1f}%")
+
+        print()
+        print(f"每个用户占用的内存（加载全部 {args.users} 个用户）")
+        print("=" * 64)
+        loaders = (("ORM实体", load_orm), ("字典", load_dicts), ("UserRecord", load_records))
+        usage = [(name, await measure_memory(db_manager, load)) for name, load in loaders]
+        orm = usage[0][1]
+        for name, used in usage:
+            print(f"{name:<18} {used:>10.0f} 字节 {orm / used:>8.1f}x")
+    finally:
+        await db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM实体查询与列投影查询的开销对比")
+    parser.add_argument("--database-url", help="数据库连接URL（会写入测试用户），不填时使用临时SQLite数据库")
+    parser.add_argument("--users", type=int, default=10000, help="测试用户数")
+    parser.add_argument("--lookups", type=int, default=5000, help="每项测试的查询次数")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
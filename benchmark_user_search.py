@@ -0,0 +1,159 @@
+"""
+用户搜索基准测试
+在一张合成的大用户表（默认100万行）上测量前缀搜索的延迟，
+并与原来只能使用的 LIKE '%x%' 全表扫描对比
+
+会向目标数据库写入大量测试数据，请使用单独的基准测试数据库，例如：
+python benchmark_user_search.py --database-url mysql+aiomysql://root:密码@localhost:3306/user_service_bench
+
+使用方法：python benchmark_user_search.py --database-url URL [--rows 1000000] [--queries 200]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import func, insert, select
+
+from app.crud import user_crud
+from app.database import DatabaseManager, User
+from app.schemas import identity_columns
+
+# 合成数据使用的域名，少数几个大域名占大部分用户，更接近真实分布
+DOMAINS = ["gmail.com", "qq.com", "163.com", "outlook.com", "example.com"] + [
+    f"corp{i}.example.org" for i in range(200)
+]
+# 测试数据不需要真实的密码哈希
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+def synthetic_user(n: int, started: datetime) -> dict:
+    """
+    生成第n个合成用户（确定性，重复运行得到相同数据）
+    """
+    rng = random.Random(n)
+    domain = DOMAINS[0] if n % 3 == 0 else rng.choice(DOMAINS)
+    username = f"u{rng.randrange(36 ** 4):05x}_{n}"
+    email = f"{username}@{domain}"
+    return {
+        "username": username,
+        "email": email,
+        **identity_columns(username, email),
+        "hashed_password": FAKE_HASH,
+        "is_active": n % 10 != 0,
+        "created_at": started + timedelta(seconds=n),
+    }
+
+
+async def populate(db_manager: DatabaseManager, rows: int, batch_size: int):
+    """
+    创建表并补足合成数据到指定行数
+    """
+    await db_manager.create_tables()
+    async for db in db_manager.get_session():
+        existing = (await db.execute(select(func.count(User.id)))).scalar_one()
+    if existing >= rows:
+        print(f"表中已有 {existing:,} 行，跳过生成数据")
+        return
+
+    print(f"生成合成数据：{existing:,} -> {rows:,} 行")
+    started = time.perf_counter()
+    base_time = datetime(2020, 1, 1)
+    for start in range(existing, rows, batch_size):
+        batch = [synthetic_user(n, base_time) for n in range(start, min(start + batch_size, rows))]
+        async for db in db_manager.get_session():
+            await db.execute(insert(User).values(batch))
+            await db.commit()
+        done = start + len(batch)
+        if done % (batch_size * 20) == 0 or done == rows:
+            elapsed = time.perf_counter() - started
+            print(f"  已写入 {done:,} 行，{(done - existing) / elapsed:,.0f} 行/秒")
+
+
+async def measure(name: str, queries: int, run: Callable[[int], Awaitable[int]]):
+    """
+    执行若干次查询并输出延迟分布
+    """
+    latencies: List[float] = []
+    matched = 0
+    for i in range(queries):
+        started = time.perf_counter()
+        matched += await run(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<28} {queries:>6} {statistics.median(latencies):>10.2f} {p95:>10.2f} "
+          f"{p99:>10.2f} {matched / queries:>8.1f}")
+
+
+async def run_benchmark(args):
+    db_manager = DatabaseManager(args.database_url)
+    try:
+        if not args.skip_populate:
+            await populate(db_manager, args.rows, args.batch_size)
+
+        async for db in db_manager.get_session():
+            total = (await db.execute(select(func.count(User.id)))).scalar_one()
+            rng = random.Random(42)
+            sample = [synthetic_user(rng.randrange(total), datetime(2020, 1, 1)) for _ in range(args.queries)]
+
+            async def search(field: str, term: str, pages: int = 1) -> int:
+                after = None
+                found = 0
+                for _ in range(pages):
+                    items, after = await user_crud.search_users(db, field, term, limit=args.limit, after=after)
+                    found += len(items)
+                    if after is None:
+                        break
+                return found
+
+            async def contains_scan(term: str) -> int:
+                # 原来的做法：LIKE '%x%'，无法使用索引
+                query = select(User.id).where(User.username.contains(term, autoescape=True)).limit(args.limit)
+                return len((await db.execute(query)).all())
+
+            print(f"表中共 {total:,} 行，每页 {args.limit} 条（延迟单位：毫秒）")
+            print("=" * 72)
+            print(f"{'查询':<28} {'次数':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'平均结果':>8}")
+            print("=" * 72)
+
+            await measure("用户名前缀(4字符)", args.queries,
+                          lambda i: search("username", sample[i]["username"][:4]))
+            await measure("用户名精确前缀", args.queries,
+                          lambda i: search("username", sample[i]["username"]))
+            await measure("邮箱前缀", args.queries,
+                          lambda i: search("email", sample[i]["email"][:8]))
+            await measure("域名(第1页)", args.queries,
+                          lambda i: search("domain", DOMAINS[i % len(DOMAINS)]))
+            await measure("域名(翻5页)", args.queries,
+                          lambda i: search("domain", DOMAINS[i % len(DOMAINS)], pages=5))
+            # 全表扫描很慢，只执行少量次数作对比
+            scans = max(1, min(args.queries, args.scan_queries))
+            await measure("LIKE '%x%' 全表扫描", scans,
+                          lambda i: contains_scan(sample[i]["username"].split("_")[-1] + "x"))
+    finally:
+        await db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户搜索基准测试")
+    parser.add_argument("--database-url", required=True, help="基准测试数据库连接URL（会写入测试数据）")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="合成用户行数")
+    parser.add_argument("--batch-size", type=int, default=5000, help="生成数据时每批INSERT的行数")
+    parser.add_argument("--queries", type=int, default=200, help="每项测试的查询次数")
+    parser.add_argument("--scan-queries", type=int, default=10, help="全表扫描对比的查询次数")
+    parser.add_argument("--limit", type=int, default=20, help="每页条数")
+    parser.add_argument("--skip-populate", action="store_true", help="不生成数据，直接使用已有的表")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
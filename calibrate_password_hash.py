@@ -0,0 +1,81 @@
+"""
+密码哈希参数校准脚本
+在当前机器上测量不同工作因子的校验耗时，给出接近目标耗时的参数，
+把结果写入 .env（--write）后，同类机器上的所有工作进程使用相同的参数。
+服务启动时不做校准：各进程各自校准可能得到不同的参数，互相把对方的哈希判定为需要重新加密
+
+使用方法：python calibrate_password_hash.py --target-ms 250 [--scheme argon2] [--write .env]
+"""
+
+import argparse
+import logging
+import os
+from typing import Dict
+
+from app.config import settings
+from app.hashing import calibrate_argon2, calibrate_bcrypt_rounds
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+
+
+def write_env_file(path: str, values: Dict[str, str]):
+    """
+    把配置写入环境变量文件：已有的键原地替换，没有的追加到末尾
+
+    Args:
+        path: 环境变量文件路径
+        values: 键 -> 值
+    """
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    remaining = dict(values)
+    for index, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in remaining:
+            lines[index] = f"{key}={remaining.pop(key)}"
+    lines.extend(f"{key}={value}" for key, value in remaining.items())
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="密码哈希参数校准")
+    parser.add_argument("--target-ms", type=float, default=settings.password_hash_target_ms,
+                        help="目标校验耗时（毫秒）")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.password_hash_scheme,
+                        help="哈希方案")
+    parser.add_argument("--write", metavar="ENV_FILE", help="把结果写入该环境变量文件（例如 .env）")
+    args = parser.parse_args()
+
+    print(f"开始校准 {args.scheme}，目标校验耗时 {args.target_ms}ms ...")
+    print("=" * 50)
+
+    if args.scheme == "argon2":
+        params = calibrate_argon2(
+            args.target_ms,
+            memory_cost=settings.argon2_memory_cost,
+            parallelism=settings.argon2_parallelism,
+        )
+        values = {key.upper(): str(value) for key, value in params.items()}
+    else:
+        values = {"BCRYPT_ROUNDS": str(calibrate_bcrypt_rounds(args.target_ms))}
+    values = {"PASSWORD_HASH_SCHEME": args.scheme, **values}
+
+    print("=" * 50)
+    if args.write:
+        write_env_file(args.write, values)
+        print(f"已将以下配置写入 {args.write}：")
+    else:
+        print("请将以下配置写入 .env 文件（或使用 --write .env）：")
+    for key, value in values.items():
+        print(f"{key}={value}")
+    print("所有工作进程重启后使用新参数，已有用户会在下次登录时自动用新参数重新加密密码。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+批量导入用户脚本
+流式读取CSV或JSONL文件，用进程池并行加密密码，按批多行INSERT写入数据库。
+单行数据有误或与已有用户重复时只记录到错误文件，不影响同批其他行；
+每批提交后写入检查点，中断后重新运行同一命令即可从检查点继续
+
+输入字段：username、email，以及 password（明文）或 hashed_password（已加密的bcrypt/argon2哈希）
+二选一；可选 is_active（true/false，默认true）
+
+使用方法：python import_users.py users.csv [--chunk-size 1000] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.crud import duplicate_field
+from app.database import DatabaseManager, User
+from app.hashing import hash_password, init_worker_context
+from app.schemas import UserCreate, UserIdentity
+from app.security import pwd_context
+
+# 一条输入记录：(行号, 字段)
+Record = Tuple[int, Dict[str, Any]]
+
+
+def read_records(path: str, file_format: str, start_after: int = 0) -> Iterator[Record]:
+    """
+    流式读取输入文件，不把整个文件载入内存
+
+    Args:
+        path: 输入文件路径
+        file_format: 文件格式（csv或jsonl）
+        start_after: 跳过行号不大于该值的记录（从检查点继续时使用）
+
+    Yields:
+        Record: (行号, 字段)，JSONL无法解析的行字段为None
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                if reader.line_num > start_after:
+                    yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if line_no <= start_after or not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+
+
+def chunked(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    """
+    把记录流按固定大小分批
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_bool(value: Any) -> bool:
+    """
+    解析is_active字段，空值视为true
+    """
+    if value is None or value == "":
+        return True
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+class UserImporter:
+    """
+    用户导入器
+    """
+
+    def __init__(self, db_manager: DatabaseManager, pool: ProcessPoolExecutor,
+                 errors_file, checkpoint_path: str):
+        """
+        初始化导入器
+
+        Args:
+            db_manager: 数据库管理器
+            pool: 密码哈希进程池
+            errors_file: 错误记录输出文件（JSONL）
+            checkpoint_path: 检查点文件路径
+        """
+        self.db_manager = db_manager
+        self.pool = pool
+        self.errors_file = errors_file
+        self.checkpoint_path = checkpoint_path
+        self.imported = 0
+        self.failed = 0
+
+    def write_errors(self, errors: List[Dict[str, Any]]):
+        """
+        把一批失败的行写入错误文件（不包含密码）
+        """
+        for error in errors:
+            self.errors_file.write(json.dumps(error, ensure_ascii=False) + "\n")
+        self.errors_file.flush()
+        self.failed += len(errors)
+
+    @staticmethod
+    def make_error(line_no: int, error: str, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        构建一条错误记录
+        """
+        row = {"line": line_no, "error": error}
+        if fields:
+            row["username"] = fields.get("username")
+            row["email"] = fields.get("email")
+        return row
+
+    def validate(self, chunk: List[Record]):
+        """
+        校验一批记录
+
+        Returns:
+            Tuple: ([(行号, 插入值)], [明文密码], [错误记录])，
+            明文密码与hashed_password为None的行按顺序对应
+        """
+        rows = []
+        passwords = []
+        errors = []
+        for line_no, fields in chunk:
+            if not isinstance(fields, dict):
+                errors.append(self.make_error(line_no, "无法解析的行"))
+                continue
+            try:
+                hashed_password = fields.get("hashed_password") or None
+                if hashed_password:
+                    user = UserIdentity(username=fields.get("username"), email=fields.get("email"))
+                    if not isinstance(hashed_password, str):
+                        raise ValueError("hashed_password必须是字符串")
+                    if pwd_context.identify(hashed_password) is None:
+                        raise ValueError("无法识别的密码哈希")
+                else:
+                    user = UserCreate(
+                        username=fields.get("username"),
+                        email=fields.get("email"),
+                        password=fields.get("password") or "",
+                    )
+                    passwords.append(user.password)
+            except (ValidationError, ValueError) as e:
+                errors.append(self.make_error(line_no, str(e).replace("\n", " "), fields))
+                continue
+
+            rows.append((line_no, {
+                "username": user.username,
+                "email": user.email,
+                **user.identity_columns(),
+                "hashed_password": hashed_password,
+                "is_active": parse_bool(fields.get("is_active")),
+                "created_at": datetime.utcnow(),
+            }))
+        return rows, passwords, errors
+
+    async def hash_passwords(self, passwords: List[str]) -> List[str]:
+        """
+        在进程池中并行加密一批密码（在线程中等待，不阻塞事件循环）
+        """
+        if not passwords:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: list(self.pool.map(hash_password, passwords, chunksize=8))
+        )
+
+    async def insert_rows(self, rows: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        用一条多行INSERT写入一批用户；整批失败（如存在重复用户）时改为逐行写入，
+        每行使用一个保存点，失败的行返回给调用方，其余行照常提交
+
+        Returns:
+            List[Dict[str, Any]]: 插入失败的行的错误记录
+        """
+        errors = []
+        if not rows:
+            return errors
+
+        async for db in self.db_manager.get_session():
+            try:
+                await db.execute(insert(User).values([values for _, values in rows]))
+                await db.commit()
+                self.imported += len(rows)
+                return errors
+            except IntegrityError:
+                await db.rollback()
+
+            for line_no, values in rows:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(User).values(**values))
+                    self.imported += 1
+                except IntegrityError as e:
+                    field = duplicate_field(e)
+                    errors.append(self.make_error(line_no, f"{field}已存在" if field else str(e.orig), values))
+            await db.commit()
+        return errors
+
+    def save_checkpoint(self, line_no: int):
+        """
+        原子地写入检查点：先写临时文件再替换
+        """
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"line": line_no, "imported": self.imported, "failed": self.failed}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    async def run(self, records: Iterator[Record], chunk_size: int):
+        """
+        执行导入：加密下一批密码的同时写入当前批
+        """
+        started = time.perf_counter()
+        processed = 0
+        pending = None  # (批次最后行号, 批次大小, 待插入行, 校验错误, 加密任务)
+
+        for chunk in chunked(records, chunk_size):
+            rows, passwords, errors = self.validate(chunk)
+            task = asyncio.ensure_future(self.hash_passwords(passwords))
+            if pending is not None:
+                await self.finish_chunk(*pending)
+                processed += pending[1]
+                self.report(processed, started)
+            pending = (chunk[-1][0], len(chunk), rows, errors, task)
+
+        if pending is not None:
+            await self.finish_chunk(*pending)
+            processed += pending[1]
+            self.report(processed, started)
+
+        elapsed = time.perf_counter() - started
+        print("=" * 60)
+        print(f"导入完成：处理 {processed} 行，成功 {self.imported}，失败 {self.failed}，"
+              f"耗时 {elapsed:.1f}s，{processed / elapsed if elapsed else 0:,.0f} 行/秒")
+
+    async def finish_chunk(self, last_line: int, size: int, rows, errors, task):
+        """
+        等待一批密码加密完成，写入数据库，记录失败的行并保存检查点
+        错误记录和检查点同批写入，从检查点继续时不会重复记录
+        """
+        hashes = iter(await task)
+        for _, values in rows:
+            if values["hashed_password"] is None:
+                values["hashed_password"] = next(hashes)
+        errors = errors + await self.insert_rows(rows)
+        errors.sort(key=lambda error: error["line"])
+        self.write_errors(errors)
+        self.save_checkpoint(last_line)
+
+    def report(self, processed: int, started: float):
+        """
+        输出进度和吞吐量
+        """
+        elapsed = time.perf_counter() - started
+        print(f"已处理 {processed} 行（成功 {self.imported}，失败 {self.failed}），"
+              f"{processed / elapsed if elapsed else 0:,.0f} 行/秒")
+
+
+async def import_users(args):
+    """
+    按命令行参数执行导入
+    """
+    file_format = args.format or ("jsonl" if args.input.endswith((".jsonl", ".ndjson")) else "csv")
+    checkpoint_path = args.checkpoint or args.input + ".checkpoint"
+    errors_path = args.errors or args.input + ".errors.jsonl"
+
+    start_after = 0
+    if os.path.exists(checkpoint_path) and not args.restart:
+        with open(checkpoint_path) as f:
+            start_after = json.load(f)["line"]
+        print(f"从检查点继续：跳过第 {start_after} 行及之前的记录")
+
+    db_manager = DatabaseManager.from_settings(settings)
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers or None,
+        initializer=init_worker_context,
+        initargs=(pwd_context.to_string(),),
+    )
+    try:
+        with open(errors_path, "a" if start_after else "w", encoding="utf-8") as errors_file:
+            importer = UserImporter(db_manager, pool, errors_file, checkpoint_path)
+            await importer.run(read_records(args.input, file_format, start_after), args.chunk_size)
+        if importer.failed:
+            print(f"失败的行已写入 {errors_path}")
+    finally:
+        pool.shutdown()
+        await db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入用户")
+    parser.add_argument("input", help="输入文件（CSV或JSONL）")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="文件格式，不填时按扩展名判断")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每批INSERT的行数")
+    parser.add_argument("--workers", type=int, default=0, help="密码加密进程数，0表示使用CPU核心数")
+    parser.add_argument("--checkpoint", help="检查点文件，默认为 <输入文件>.checkpoint")
+    parser.add_argument("--errors", help="错误记录文件，默认为 <输入文件>.errors.jsonl")
+    parser.add_argument("--restart", action="store_true", help="忽略已有检查点，从头开始导入")
+    args = parser.parse_args()
+
+    if settings.db_backend == "sqlite":
+        target = f"SQLite {settings.sqlite_path}"
+    else:
+        target = f"{settings.db_host}:{settings.db_port}/{settings.db_name}"
+    print(f"开始导入 {args.input} 到 {target}")
+    print("=" * 60)
+    try:
+        asyncio.run(import_users(args))
+    except KeyboardInterrupt:
+        print("\n导入已中断，重新运行同一命令即可从检查点继续")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 """
-数据库初始化脚本
-用于创建数据库和表结构
+数据库初始化和迁移脚本
+创建数据库，并把表结构迁移到最新版本（见 app/migrations）。
+首次部署和每次升级后运行一次；已是最新版本时不做任何变更
 """
 
+import argparse
 import asyncio
 import sys
 import os
@@ -12,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config import settings
 from app.database import DatabaseManager
+from app.migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, migrate
 import aiomysql
 import logging
 
@@ -23,7 +26,14 @@ logger = logging.getLogger(__name__)
 async def create_database_if_not_exists():
     """
     如果数据库不存在，则创建数据库
+    SQLite数据库文件在首次连接时自动创建，只需确保所在目录存在
     """
+    if settings.db_backend == "sqlite":
+        directory = os.path.dirname(os.path.abspath(settings.sqlite_path))
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"SQLite数据库文件: {settings.sqlite_path}")
+        return
+    
     try:
         # 连接到MySQL服务器（不指定数据库）
         connection = await aiomysql.connect(
@@ -47,33 +57,64 @@ async def create_database_if_not_exists():
 
 async def initialize_database():
     """
-    初始化数据库：创建数据库和表
+    初始化数据库：创建数据库并执行迁移
     """
     try:
         # 1. 创建数据库
         await create_database_if_not_exists()
         
-        # 2. 创建数据库管理器并创建表
-        db_manager = DatabaseManager(settings.database_url)
-        await db_manager.create_tables()
-        
-        # 3. 关闭数据库连接
-        await db_manager.close()
+        # 2. 执行尚未执行的迁移
+        db_manager = DatabaseManager.from_settings(settings)
+        try:
+            before, after = await migrate(db_manager.engine)
+        finally:
+            # 3. 关闭数据库连接
+            await db_manager.close()
         
-        logger.info("数据库初始化完成")
+        if before == after:
+            logger.info(f"数据库结构已是最新版本（{after}）")
+        else:
+            logger.info(f"数据库结构已从版本 {before} 迁移到 {after}")
         
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
         raise
 
 
+async def show_status():
+    """
+    显示当前结构版本和待执行的迁移
+    """
+    db_manager = DatabaseManager.from_settings(settings)
+    try:
+        version = await get_schema_version(db_manager.engine)
+    finally:
+        await db_manager.close()
+    
+    print(f"当前版本：{version}，最新版本：{LATEST_VERSION}")
+    for migration in MIGRATIONS:
+        state = "已执行" if migration.version <= version else "待执行"
+        print(f"  [{state}] {migration.name}: {migration.description}")
+
+
 if __name__ == "__main__":
     """
     运行数据库初始化
-    使用方法：python init_db.py
+    使用方法：python init_db.py [--status]
     """
+    parser = argparse.ArgumentParser(description="数据库初始化和迁移")
+    parser.add_argument("--status", action="store_true", help="只显示迁移状态，不执行迁移")
+    args = parser.parse_args()
+    
+    if args.status:
+        asyncio.run(show_status())
+        sys.exit(0)
+    
     print("开始初始化数据库...")
-    print(f"数据库配置：{settings.db_host}:{settings.db_port}/{settings.db_name}")
+    if settings.db_backend == "sqlite":
+        print(f"数据库配置：SQLite {settings.sqlite_path}")
+    else:
+        print(f"数据库配置：{settings.db_host}:{settings.db_port}/{settings.db_name}")
     print("=" * 50)
     
     try:
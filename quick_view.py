@@ -1,51 +1,84 @@
 """
 快速查看数据库用户脚本
-一键显示所有用户信息
+一键显示所有用户信息；用户按ID分批流式读取，表再大内存占用也保持不变
+
+使用方法：python quick_view.py [--limit 100] [--after-id 0] [--active | --inactive] [--since 2024-01-01]
 """
 
+import argparse
 import asyncio
-from sqlalchemy import select
+from datetime import date, datetime
 from app.config import settings
-from app.database import DatabaseManager, User
+from app.database import DatabaseManager
+from app.crud import user_crud
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="快速查看数据库用户")
+    parser.add_argument("--limit", type=int, default=None, help="最多显示多少个用户，不填表示全部")
+    parser.add_argument("--after-id", type=int, default=0, help="从该ID之后开始显示")
+    status = parser.add_mutually_exclusive_group()
+    status.add_argument("--active", dest="is_active", action="store_const", const=True, help="只显示活跃用户")
+    status.add_argument("--inactive", dest="is_active", action="store_const", const=False, help="只显示禁用用户")
+    parser.add_argument("--since", type=date.fromisoformat, help="只显示该日期及之后注册的用户（YYYY-MM-DD）")
+    parser.add_argument("--until", type=date.fromisoformat, help="只显示该日期之前注册的用户（YYYY-MM-DD）")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批读取的行数")
+    return parser.parse_args()
+
+
+def to_datetime(value):
+    """把日期转换为当天零点"""
+    return datetime.combine(value, datetime.min.time()) if value else None
+
 
-async def quick_view_users():
-    """快速查看所有用户"""
+async def quick_view_users(args):
+    """快速查看用户"""
     print("🔍 数据库用户快速查看")
     print("=" * 60)
-    
+
     try:
         # 创建数据库管理器
-        db_manager = DatabaseManager(settings.database_url)
-        
-        # 获取用户数据
+        db_manager = DatabaseManager.from_settings(settings)
+
+        # 流式获取用户数据，边读边输出
+        count = 0
+        last_id = args.after_id
         async for session in db_manager.get_session():
-            query = select(User).order_by(User.id)
-            result = await session.execute(query)
-            users = result.scalars().all()
-            
-            if not users:
-                print("📭 数据库中没有用户")
-            else:
-                print(f"📊 共找到 {len(users)} 个用户:\n")
-                
-                for i, user in enumerate(users, 1):
-                    print(f"👤 用户 {i}:")
-                    print(f"   🆔 ID: {user.id}")
-                    print(f"   👤 用户名: {user.username}")
-                    print(f"   📧 邮箱: {user.email}")
-                    print(f"   📊 状态: {'✅ 活跃' if user.is_active else '❌ 禁用'}")
-                    
-                    # 格式化时间
-                    created_at = user.created_at.strftime("%Y-%m-%d %H:%M:%S") if user.created_at else "未知"
-                    last_login = user.last_login.strftime("%Y-%m-%d %H:%M:%S") if user.last_login else "从未登录"
-                    
-                    print(f"   📅 注册时间: {created_at}")
-                    print(f"   🕐 最后登录: {last_login}")
-                    print()
-        
+            users = user_crud.stream_users(
+                session,
+                after_id=args.after_id,
+                limit=args.limit,
+                is_active=args.is_active,
+                created_after=to_datetime(args.since),
+                created_before=to_datetime(args.until),
+                batch_size=args.batch_size,
+            )
+            async for user in users:
+                count += 1
+                last_id = user.id
+                print(f"👤 用户 {count}:")
+                print(f"   🆔 ID: {user.id}")
+                print(f"   👤 用户名: {user.username}")
+                print(f"   📧 邮箱: {user.email}")
+                print(f"   📊 状态: {'✅ 活跃' if user.is_active else '❌ 禁用'}")
+
+                # 格式化时间
+                created_at = user.created_at.strftime("%Y-%m-%d %H:%M:%S") if user.created_at else "未知"
+                last_login = user.last_login.strftime("%Y-%m-%d %H:%M:%S") if user.last_login else "从未登录"
+
+                print(f"   📅 注册时间: {created_at}")
+                print(f"   🕐 最后登录: {last_login}")
+                print()
+
+        if count == 0:
+            print("📭 没有符合条件的用户")
+        else:
+            print(f"📊 共显示 {count} 个用户（可用 --after-id {last_id} 继续查看后面的用户）")
+
         # 关闭数据库连接
         await db_manager.close()
-        
+
     except Exception as e:
         print(f"❌ 查看用户失败: {e}")
         print("请确保:")
@@ -57,49 +90,39 @@ async def count_users():
     """统计用户数量"""
     print("📊 用户统计信息")
     print("=" * 30)
-    
+
     try:
-        db_manager = DatabaseManager(settings.database_url)
-        
+        db_manager = DatabaseManager.from_settings(settings)
+
         async for session in db_manager.get_session():
-            # 总用户数
-            total_query = select(User)
-            total_result = await session.execute(total_query)
-            total_users = len(total_result.scalars().all())
-            
-            # 活跃用户数
-            active_query = select(User).where(User.is_active == True)
-            active_result = await session.execute(active_query)
-            active_users = len(active_result.scalars().all())
-            
-            # 今日注册用户
-            from datetime import datetime, date
-            today = date.today()
-            today_query = select(User).where(User.created_at >= today)
-            today_result = await session.execute(today_query)
-            today_users = len(today_result.scalars().all())
-            
+            # 在数据库中计数，不加载用户数据
+            total_users = await user_crud.count_users(session)
+            active_users = await user_crud.count_users(session, is_active=True)
+            today_users = await user_crud.count_users(session, created_after=to_datetime(date.today()))
+
             print(f"👥 总用户数: {total_users}")
             print(f"✅ 活跃用户: {active_users}")
             print(f"❌ 禁用用户: {total_users - active_users}")
             print(f"🆕 今日注册: {today_users}")
-        
+
         await db_manager.close()
-        
+
     except Exception as e:
         print(f"❌ 统计失败: {e}")
 
 if __name__ == "__main__":
+    args = parse_args()
+
     print("选择操作:")
     print("1. 查看所有用户详情")
     print("2. 查看用户统计")
-    
+
     choice = input("请选择 (1/2): ").strip()
-    
+
     if choice == "1":
-        asyncio.run(quick_view_users())
+        asyncio.run(quick_view_users(args))
     elif choice == "2":
         asyncio.run(count_users())
     else:
         print("默认显示所有用户:")
-        asyncio.run(quick_view_users())
\ No newline at end of file
+        asyncio.run(quick_view_users(args))
@@ -5,6 +5,8 @@ API测试脚本
 
 import requests
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # API基础URL
 BASE_URL = "http://localhost:8000"
@@ -54,6 +56,37 @@ def test_user_register():
         print(f"请求失败: {e}")
         return False
 
+def test_concurrent_register(concurrency=10):
+    """测试并发重复注册：同时提交相同的注册数据，只能有一个成功"""
+    print("=" * 50)
+    print("测试并发重复注册")
+    print("=" * 50)
+    
+    # 每次运行使用不同的用户名，避免与之前的数据冲突
+    suffix = uuid.uuid4().hex[:8]
+    user_data = {
+        "username": f"race_{suffix}",
+        "email": f"race_{suffix}@example.com",
+        "password": "testpass123"
+    }
+    
+    def register(_):
+        response = requests.post(f"{API_BASE}/auth/register", json=user_data)
+        return response.status_code
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            status_codes = list(executor.map(register, range(concurrency)))
+        
+        print(f"状态码: {status_codes}")
+        
+        # 恰好一个成功，其余都应返回400（用户名已存在），不能出现500
+        return status_codes.count(200) == 1 and status_codes.count(400) == concurrency - 1
+        
+    except Exception as e:
+        print(f"请求失败: {e}")
+        return False
+
 def test_user_login():
     """测试用户登录接口"""
     print("=" * 50)
@@ -88,6 +121,31 @@ def test_user_login():
         print(f"请求失败: {e}")
         return None
 
+def test_get_current_user(token=None):
+    """测试获取当前用户信息接口"""
+    print("=" * 50)
+    print("测试获取当前用户信息接口")
+    print("=" * 50)
+    
+    if not token:
+        print("没有可用的访问令牌，跳过")
+        return False
+    
+    try:
+        response = requests.get(
+            f"{API_BASE}/auth/me",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        
+        print(f"状态码: {response.status_code}")
+        print(f"响应内容: {json.dumps(response.json(), ensure_ascii=False, indent=2)}")
+        
+        return response.status_code == 200
+        
+    except Exception as e:
+        print(f"请求失败: {e}")
+        return False
+
 def main():
     """主测试函数"""
     print("开始API功能测试")
@@ -112,6 +170,12 @@ def main():
         if token:
             print("✅ 用户登录测试通过")
             print(f"获取到访问令牌: {token[:20]}...")
+            
+            # 测试获取当前用户信息
+            if test_get_current_user(token):
+                print("✅ 获取当前用户信息测试通过")
+            else:
+                print("❌ 获取当前用户信息测试失败")
         else:
             print("❌ 用户登录测试失败")
     else:
@@ -120,6 +184,12 @@ def main():
         print("- MySQL数据库未启动")
         print("- 数据库连接配置错误")
         print("- 用户名或邮箱已存在")
+    
+    # 测试并发重复注册
+    if test_concurrent_register():
+        print("✅ 并发重复注册测试通过")
+    else:
+        print("❌ 并发重复注册测试失败")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
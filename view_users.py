@@ -1,44 +1,51 @@
 """
 数据库用户查看脚本
 用于查看MySQL数据库中的所有用户信息
+
+使用方法：python view_users.py [--limit 100] [--after-id 0] [--active | --inactive] [--since 2024-01-01]
+（过滤参数作用于“查看所有用户”）
 """
 
+import argparse
 import asyncio
 import sys
-from datetime import datetime
-from sqlalchemy import select
+from datetime import date, datetime
 from app.config import settings
-from app.database import DatabaseManager, User
+from app.crud import user_crud
+from app.database import DatabaseManager
 
 class UserViewer:
     """用户查看器"""
     
-    def __init__(self):
+    def __init__(self, args=None):
         """初始化数据库管理器"""
-        self.db_manager = DatabaseManager(settings.database_url)
+        self.db_manager = DatabaseManager.from_settings(settings)
+        self.args = args
     
-    async def get_all_users(self):
-        """获取所有用户"""
+    async def iter_users(self):
+        """按ID分批流式获取用户（应用命令行中的分页和过滤参数），内存占用与表大小无关"""
+        args = self.args
         try:
             async for session in self.db_manager.get_session():
-                # 查询所有用户
-                query = select(User).order_by(User.id)
-                result = await session.execute(query)
-                users = result.scalars().all()
-                
-                return users
+                users = user_crud.stream_users(
+                    session,
+                    after_id=args.after_id if args else 0,
+                    limit=args.limit if args else None,
+                    is_active=args.is_active if args else None,
+                    created_after=to_datetime(args.since) if args else None,
+                    created_before=to_datetime(args.until) if args else None,
+                    batch_size=args.batch_size if args else 1000,
+                )
+                async for user in users:
+                    yield user
         except Exception as e:
             print(f"❌ 获取用户列表失败: {e}")
-            return []
     
     async def get_user_by_id(self, user_id):
         """根据ID获取用户"""
         try:
             async for session in self.db_manager.get_session():
-                query = select(User).where(User.id == user_id)
-                result = await session.execute(query)
-                user = result.scalar_one_or_none()
-                return user
+                return await user_crud.get_user_record_by_id(session, user_id)
         except Exception as e:
             print(f"❌ 获取用户失败: {e}")
             return None
@@ -47,10 +54,7 @@ class UserViewer:
         """根据用户名获取用户"""
         try:
             async for session in self.db_manager.get_session():
-                query = select(User).where(User.username == username)
-                result = await session.execute(query)
-                user = result.scalar_one_or_none()
-                return user
+                return await user_crud.get_user_record_by_username(session, username)
         except Exception as e:
             print(f"❌ 获取用户失败: {e}")
             return None
@@ -61,23 +65,28 @@ class UserViewer:
             return dt.strftime("%Y-%m-%d %H:%M:%S")
         return "未记录"
     
-    def display_users(self, users):
-        """显示用户列表"""
-        if not users:
-            print("📭 数据库中没有用户")
-            return
-        
-        print(f"\n📊 数据库中共有 {len(users)} 个用户:")
-        print("=" * 100)
-        print(f"{'ID':<4} {'用户名':<15} {'邮箱':<25} {'状态':<6} {'注册时间':<19} {'最后登录':<19}")
-        print("=" * 100)
-        
-        for user in users:
+    async def display_users(self, users):
+        """边读取边显示用户列表"""
+        count = 0
+        last_id = None
+        async for user in users:
+            if count == 0:
+                print("=" * 100)
+                print(f"{'ID':<4} {'用户名':<15} {'邮箱':<25} {'状态':<6} {'注册时间':<19} {'最后登录':<19}")
+                print("=" * 100)
+            count += 1
+            last_id = user.id
+            
             status = "✅ 活跃" if user.is_active else "❌ 禁用"
             created_at = self.format_datetime(user.created_at)
             last_login = self.format_datetime(user.last_login)
             
             print(f"{user.id:<4} {user.username:<15} {user.email:<25} {status:<6} {created_at:<19} {last_login:<19}")
+        
+        if count == 0:
+            print("📭 没有符合条件的用户")
+        else:
+            print(f"\n📊 共显示 {count} 个用户（可用 --after-id {last_id} 继续查看后面的用户）")
     
     def display_user_detail(self, user):
         """显示用户详细信息"""
@@ -90,7 +99,8 @@ class UserViewer:
         print(f"🆔 用户ID: {user.id}")
         print(f"👤 用户名: {user.username}")
         print(f"📧 邮箱: {user.email}")
-        print(f"🔒 密码哈希: {user.hashed_password[:50]}...")
+        if user.hashed_password:
+            print(f"🔒 密码哈希: {user.hashed_password[:50]}...")
         print(f"📊 账户状态: {'✅ 活跃' if user.is_active else '❌ 禁用'}")
         print(f"📅 注册时间: {self.format_datetime(user.created_at)}")
         print(f"🕐 最后登录: {self.format_datetime(user.last_login)}")
@@ -99,14 +109,31 @@ class UserViewer:
         """关闭数据库连接"""
         await self.db_manager.close()
 
-async def main():
+def to_datetime(value):
+    """把日期转换为当天零点"""
+    return datetime.combine(value, datetime.min.time()) if value else None
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="数据库用户查看器")
+    parser.add_argument("--limit", type=int, default=None, help="最多显示多少个用户，不填表示全部")
+    parser.add_argument("--after-id", type=int, default=0, help="从该ID之后开始显示")
+    status = parser.add_mutually_exclusive_group()
+    status.add_argument("--active", dest="is_active", action="store_const", const=True, help="只显示活跃用户")
+    status.add_argument("--inactive", dest="is_active", action="store_const", const=False, help="只显示禁用用户")
+    parser.add_argument("--since", type=date.fromisoformat, help="只显示该日期及之后注册的用户（YYYY-MM-DD）")
+    parser.add_argument("--until", type=date.fromisoformat, help="只显示该日期之前注册的用户（YYYY-MM-DD）")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批读取的行数")
+    return parser.parse_args()
+
+async def main(args):
     """主函数"""
     print("🔍 数据库用户查看器")
     print("=" * 50)
     
     # 检查数据库连接
     try:
-        viewer = UserViewer()
+        viewer = UserViewer(args)
         
         while True:
             print("\n选择操作:")
@@ -119,8 +146,7 @@ async def main():
             
             if choice == "1":
                 print("\n🔄 正在获取用户列表...")
-                users = await viewer.get_all_users()
-                viewer.display_users(users)
+                await viewer.display_users(viewer.iter_users())
                 
             elif choice == "2":
                 user_id = input("请输入用户ID: ").strip()
@@ -156,4 +182,4 @@ async def main():
         print("3. user_service数据库已创建")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file